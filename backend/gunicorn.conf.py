@@ -0,0 +1,9 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Job event streams (SSE) keep their request open for up to INDEX_PROGRESS_STREAM_TIMEOUT seconds.
+# Threaded workers let a stream tie up one thread instead of a whole sync worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
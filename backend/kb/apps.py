@@ -13,3 +13,7 @@ class KbConfig(AppConfig):
         @receiver(user_logged_in)
         def ensure_token(sender, user, request, **kwargs):
             Token.objects.get_or_create(user=user)
+
+        from .warmup import start_web_warm_up
+
+        start_web_warm_up()
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+_JOB_EVENTS_SALT = 'kb.job-events'
+
+
+def job_events_token(user, task_id: str) -> str:
+    """A signed ``?token=`` that opens one job's event stream for ``user``."""
+    return signing.dumps({'user': user.pk, 'task': task_id}, salt=_JOB_EVENTS_SALT)
+
+
+class JobEventsTokenAuthentication(BaseAuthentication):
+    """Authenticates ``?token=`` from ``job_events_token``; browsers' EventSource cannot send headers.
+
+    ``request.auth`` is the token payload, so the view can check it was minted for the job requested.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            payload = signing.loads(
+                token, salt=_JOB_EVENTS_SALT, max_age=settings.INDEX_PROGRESS_TOKEN_MAX_AGE,
+            )
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Stream token is invalid or expired.')
+        user = get_user_model().objects.filter(pk=payload.get('user'), is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed('Stream token is invalid or expired.')
+        return user, payload
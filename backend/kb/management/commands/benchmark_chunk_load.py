@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from kb.models import Chunk, Document
+from kb.services import bulk_load, vector_store
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare chunk insert throughput of bulk_create and the binary COPY loader (rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--dims', type=int, default=1536)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def _chunks(self, label: str, rows: int):
+        document = Document.objects.create(title=f"chunk load benchmark ({label})")
+        return [
+            Chunk(
+                document=document,
+                collection=document.collection,
+                chunk_index=index,
+                text=f"benchmark chunk {index} " * 40,
+                vector_id=f"bench-{document.id}-{index}",
+            )
+            for index in range(rows)
+        ]
+
+    def _timed(self, label: str, rows: int, load) -> None:
+        start = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<12} {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        batch_size = options['batch_size']
+        matrix = np.random.default_rng(0).random((rows, options['dims']), dtype=np.float32)
+        try:
+            with transaction.atomic():
+                def run_bulk_create():
+                    chunks = self._chunks('bulk_create', rows)
+                    for chunk, embedding in zip(chunks, matrix):
+                        # Same shape as the previous index_document path: one float list per row.
+                        chunk.embedding = embedding.tolist()
+                    Chunk.objects.bulk_create(chunks, batch_size=batch_size)
+
+                self._timed('bulk_create', rows, run_bulk_create)
+                if vector_store.uses_pgvector():
+                    self._timed(
+                        'copy',
+                        rows,
+                        lambda: bulk_load.load_chunks(self._chunks('copy', rows), matrix, batch_size),
+                    )
+                else:
+                    self.stdout.write('copy         skipped (binary COPY needs PostgreSQL)')
+                raise _Rollback
+        except _Rollback:
+            pass
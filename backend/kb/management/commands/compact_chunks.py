@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from kb.models import Chunk, Document
+from kb.services import chunking, extraction_cache, shards, spans
+
+
+class Command(BaseCommand):
+    help = 'Convert stored chunk text to spans over one per-document source, then reclaim the freed space.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', help='Only compact documents in this collection.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--vacuum-full',
+            action='store_true',
+            help='Rewrite the tables to return space to the OS (PostgreSQL; takes an exclusive lock).',
+        )
+        parser.add_argument('--skip-vacuum', action='store_true')
+
+    def _source(self, document: Document) -> str | None:
+        source = spans.source_text(document)
+        if source:
+            return source
+        if document.file:
+            return extraction_cache.load_text(document.file.path, document.content_hash)
+        return None
+
+    def _compact(self, document: Document, batch_size: int) -> str:
+        source = self._source(document)
+        if source is None:
+            return 'skipped: no stored source or file'
+        chunk_spans = chunking.chunk_spans(source, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+        alias = shards.chunk_alias(document)
+        chunks = list(shards.chunks(document).order_by('chunk_index').only('id', 'chunk_index', 'text', 'span_start'))
+        if all(chunk.span_start is not None for chunk in chunks):
+            return 'skipped: already spans'
+        if len(chunks) != len(chunk_spans) or any(
+            chunk.span_start is None and chunk.text != source[start:end]
+            for chunk, (start, end) in zip(chunks, chunk_spans)
+        ):
+            # Chunk settings or the parser changed since indexing; offsets would point at the wrong text.
+            return 'skipped: chunks do not match the source, reindex instead'
+        for chunk, (start, end) in zip(chunks, chunk_spans):
+            chunk.text = ''
+            chunk.span_start = start
+            chunk.span_end = end
+        with transaction.atomic(), shards.atomic(alias):
+            Chunk.objects.using(alias).bulk_update(chunks, ['text', 'span_start', 'span_end'], batch_size=batch_size)
+            update_fields = spans.store_source(document, source)
+            document.save(update_fields=update_fields + ['updated_at'])
+            # Span text is sliced from the shard's mirrored row.
+            shards.sync_document(document, alias)
+        return f"{len(chunks)} chunks"
+
+    def handle(self, *args, **options):
+        if settings.CHUNK_STORAGE != 'spans':
+            self.stdout.write(self.style.WARNING(
+                'CHUNK_STORAGE is not "spans"; documents indexed from now on will store chunk text again.'
+            ))
+        docs = Document.objects.filter(
+            status=Document.Status.INDEXED,
+            duplicate_of__isnull=True,
+        ).order_by('id')
+        if not shards.sharding_enabled():
+            # Sharded chunks are not joinable from the primary; _compact skips converted documents instead.
+            docs = docs.filter(chunks__span_start__isnull=True).distinct()
+        if options['collection']:
+            docs = docs.filter(collection=options['collection'])
+
+        for document in docs.iterator():
+            self.stdout.write(f"{document.id} {document.title}: {self._compact(document, options['batch_size'])}")
+
+        if options['skip_vacuum']:
+            return
+        tables = f"{Chunk._meta.db_table}, {Document._meta.db_table}"
+        for alias in shards.write_aliases():
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(f"VACUUM ({'FULL, ' if options['vacuum_full'] else ''}ANALYZE) {tables}")
+                elif connection.vendor == 'sqlite':
+                    cursor.execute('VACUUM')
+            self.stdout.write(f"Vacuumed {tables} on {alias}")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from kb.models import Document
+from kb.services import routing, shards
+
+
+class Command(BaseCommand):
+    help = 'Store each indexed document\'s centroid embedding for document-level routing (DOC_ROUTING_TOP_N).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', help='Only update documents in this collection.')
+        parser.add_argument('--all', action='store_true', help='Recompute documents that already have one.')
+
+    def handle(self, *args, **options):
+        docs = Document.objects.filter(status=Document.Status.INDEXED, duplicate_of__isnull=True).order_by('id')
+        if options['collection']:
+            docs = docs.filter(collection=options['collection'])
+        if not options['all']:
+            docs = docs.filter(embedding__isnull=True)
+
+        updated = 0
+        for document in docs.only('id', 'title', 'shard').iterator():
+            vectors = list(
+                shards.chunks(document).exclude(embedding__isnull=True).values_list('embedding', flat=True).iterator()
+            )
+            embedding = routing.centroid(vectors)
+            Document.objects.filter(pk=document.pk).update(embedding=embedding)
+            updated += 1
+            self.stdout.write(f"{document.id} {document.title}: {len(vectors)} chunks")
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} documents"))
@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.models import Document
+from kb.services import vector_store
+
+
+class Command(BaseCommand):
+    help = 'Create the per-collection partial HNSW indexes used by vector search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('collections', nargs='*', help='Collections to index (default: every collection in use).')
+
+    def handle(self, *args, **options):
+        if not vector_store.uses_pgvector():
+            raise CommandError('Collection indexes require PostgreSQL with pgvector.')
+        collections = options['collections'] or sorted(
+            Document.objects.values_list('collection', flat=True).distinct()
+        )
+        for collection in collections:
+            try:
+                vector_store.ensure_collection_index(collection)
+            except ValidationError as exc:
+                raise CommandError(f"{collection}: {exc.messages[0]}")
+            self.stdout.write(f"{collection}: {vector_store.collection_index_name(collection)}")
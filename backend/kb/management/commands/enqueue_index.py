@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.models import Document
+from kb.services import queues
+from kb.tasks import index_document_task
+
+
+class Command(BaseCommand):
+    help = 'Queue documents for (re)indexing as a low-priority bulk backfill.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', help='Only queue documents in this collection.')
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=Document.Status.values,
+            help='Only queue documents with this status (repeatable; default: UPLOADED and FAILED).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Print the routing without queueing.')
+
+    def handle(self, *args, **options):
+        docs = Document.objects.filter(
+            status__in=options['status'] or [Document.Status.UPLOADED, Document.Status.FAILED],
+        ).order_by('id')
+        if options['collection']:
+            docs = docs.filter(collection=options['collection'])
+        if not docs.exists():
+            raise CommandError('No documents match.')
+
+        counts = {}
+        for doc in docs.iterator():
+            route = queues.route_for(doc, bulk=True)
+            if not options['dry_run']:
+                index_document_task.apply_async((doc.id,), **route)
+            counts[route['queue']] = counts.get(route['queue'], 0) + 1
+        for queue, count in sorted(counts.items()):
+            self.stdout.write(f"{queue}: {count}")
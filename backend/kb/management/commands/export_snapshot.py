@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from kb.services import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export indexed chunks, metadata and embeddings to a memory-mappable snapshot directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot directory to write.')
+        parser.add_argument('--collection', help='Only export this collection.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        manifest = snapshot.export_snapshot(
+            options['path'],
+            collection=options['collection'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f"Exported {manifest['rows']} chunks from {manifest['documents']} documents "
+            f"({manifest['dims']} dims, {manifest['embed_model']}) to {options['path']}"
+        )
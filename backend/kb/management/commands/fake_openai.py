@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from kb.services.fake_openai import FakeOpenAI
+
+
+def add_server_arguments(parser, prefix: str = '') -> None:
+    parser.add_argument(f'--{prefix}host', default='127.0.0.1')
+    parser.add_argument(f'--{prefix}port', type=int, default=8900)
+    parser.add_argument(f'--{prefix}embed-latency-ms', type=float, default=50.0)
+    parser.add_argument(f'--{prefix}chat-latency-ms', type=float, default=800.0)
+    parser.add_argument(f'--{prefix}jitter', type=float, default=0.2, help='Latency varies by +/- this fraction.')
+    parser.add_argument(f'--{prefix}error-rate', type=float, default=0.0, help='Fraction of calls that fail.')
+    parser.add_argument(f'--{prefix}error-status', type=int, default=500, help='Status of injected failures (429 or 5xx).')
+    parser.add_argument(f'--{prefix}dims', type=int, default=1536)
+
+
+def build_server(options: dict, prefix: str = '') -> FakeOpenAI:
+    key = prefix.replace('-', '_')
+    return FakeOpenAI(
+        dims=options[f'{key}dims'],
+        embed_latency_ms=options[f'{key}embed_latency_ms'],
+        chat_latency_ms=options[f'{key}chat_latency_ms'],
+        jitter=options[f'{key}jitter'],
+        error_rate=options[f'{key}error_rate'],
+        error_status=options[f'{key}error_status'],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Serve a local OpenAI-compatible stand-in (embeddings and chat) with configurable latency and errors.'
+
+    def add_arguments(self, parser):
+        add_server_arguments(parser)
+
+    def handle(self, *args, **options):
+        fake = build_server(options)
+        url = fake.start(options['host'], options['port'])
+        self.stdout.write(self.style.SUCCESS(f"Fake OpenAI listening; start the backend with OPENAI_BASE_URL={url}"))
+        try:
+            while True:
+                time.sleep(60)
+                self.stdout.write(f"served {fake.stats}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.stop()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.services import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Bulk load a snapshot written by export_snapshot as new indexed documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Snapshot directory to read.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--allow-model-mismatch',
+            action='store_true',
+            help='Import even if the snapshot was embedded with a different model than the live one.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = snapshot.import_snapshot(
+                options['path'],
+                batch_size=options['batch_size'],
+                allow_model_mismatch=options['allow_model_mismatch'],
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"Imported {counts['chunks']} chunks into {counts['documents']} documents")
@@ -0,0 +1,158 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.services import loadgen
+
+from .fake_openai import add_server_arguments, build_server
+
+SCENARIOS = ('ask', 'upload', 'index')
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive /api/ask, upload and index at increasing request rates against a running backend and '
+        'report throughput, latency percentiles, errors and the saturation point.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--token', default=os.getenv('LOADTEST_TOKEN'), help='API token (or LOADTEST_TOKEN).')
+        parser.add_argument('--username', help='Obtain a token with these credentials instead of --token.')
+        parser.add_argument('--password', default=os.getenv('LOADTEST_PASSWORD'))
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=SCENARIOS,
+            help='Endpoint to ramp (repeatable; default ask). "index" uploads then enqueues indexing.',
+        )
+        parser.add_argument('--rps', default='1,2,5,10,20', help='Comma separated target rates, run in order.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds per rate step.')
+        parser.add_argument('--concurrency', type=int, default=64, help='Maximum requests in flight.')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds.')
+        parser.add_argument('--collection', default='loadtest')
+        parser.add_argument('--seed-docs', type=int, default=20, help='Synthetic documents to index before ramping.')
+        parser.add_argument('--words-per-doc', type=int, default=800)
+        parser.add_argument('--index-timeout', type=float, default=600.0, help='Seconds to wait for index jobs.')
+        parser.add_argument('--p95-slo-ms', type=float, help='Treat a step as saturated above this p95.')
+        parser.add_argument('--max-error-rate', type=float, default=0.01)
+        parser.add_argument(
+            '--min-throughput',
+            type=float,
+            default=0.9,
+            help='Treat a step as saturated below this fraction of its target rate.',
+        )
+        parser.add_argument('--keep-going', action='store_true', help='Run every step even after saturation.')
+        parser.add_argument('--json', help='Also write the full report to this path.')
+        parser.add_argument(
+            '--fake-openai',
+            action='store_true',
+            help='Also serve the fake OpenAI API from this process (the backend must point OPENAI_BASE_URL at it).',
+        )
+        add_server_arguments(parser, prefix='fake-')
+
+    def _rates(self, value: str) -> list[float]:
+        try:
+            rates = [float(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise CommandError('--rps must be a comma separated list of numbers')
+        if not rates or any(rate <= 0 for rate in rates):
+            raise CommandError('--rps rates must be positive')
+        return rates
+
+    def _call(self, scenario: str, client: loadgen.ApiClient, corpus: loadgen.Corpus, collection: str):
+        if scenario == 'ask':
+            return lambda: client.ask(corpus.question(), collection)
+        if scenario == 'upload':
+            return lambda: client.upload(*corpus.document(), collection)
+        return lambda: loadgen.upload_and_index(client, corpus, collection)
+
+    def _ramp(self, scenario, client, corpus, rates, options) -> dict:
+        steps = []
+        saturation = None
+        self.stdout.write(f"\n{scenario}: {'rps':>7} {'ok/s':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}  statuses")
+        for rps in rates:
+            step = loadgen.run_step(
+                self._call(scenario, client, corpus, options['collection']),
+                rps,
+                options['duration'],
+                options['concurrency'],
+            )
+            job_ids = step.pop('job_ids')
+            if job_ids:
+                step['indexing'] = loadgen.wait_for_jobs(client, job_ids, options['index_timeout'])
+            step['saturated_by'] = loadgen.saturation_reasons(
+                step,
+                options['p95_slo_ms'],
+                options['max_error_rate'],
+                options['min_throughput'],
+            )
+            steps.append(step)
+            self.stdout.write(
+                f"{'':{len(scenario) + 1}} {rps:>7g} {step['throughput']:>7} {step['error_rate'] * 100:>6.2f} "
+                f"{step['p50_ms']:>8} {step['p95_ms']:>8} {step['p99_ms']:>8}  {step['statuses']}"
+            )
+            if 'indexing' in step:
+                self.stdout.write(f"{'':{len(scenario) + 9}}indexing {step['indexing']}")
+            if step['saturated_by'] and saturation is None:
+                saturation = rps
+                self.stdout.write(self.style.WARNING(f"saturated at {rps:g} rps: {'; '.join(step['saturated_by'])}"))
+                if not options['keep_going']:
+                    break
+        sustained = [step['target_rps'] for step in steps if not step['saturated_by']]
+        if any('429' in step['statuses'] for step in steps):
+            self.stdout.write(self.style.WARNING(
+                'Got 429s: per-user rate limits apply; run the backend with RATELIMIT_ENABLE=0 to measure capacity.'
+            ))
+        return {
+            'steps': steps,
+            'max_sustained_rps': max(sustained) if sustained else None,
+            'saturation_rps': saturation,
+        }
+
+    def handle(self, *args, **options):
+        rates = self._rates(options['rps'])
+        token = options['token']
+        if options['username']:
+            token = loadgen.ApiClient.obtain_token(options['base_url'], options['username'], options['password'] or '')
+        if not token:
+            raise CommandError('Pass --token (or LOADTEST_TOKEN) or --username/--password.')
+
+        fake = None
+        if options['fake_openai']:
+            fake = build_server(options, prefix='fake-')
+            url = fake.start(options['fake_host'], options['fake_port'])
+            self.stdout.write(f"Fake OpenAI at {url}")
+
+        client = loadgen.ApiClient(options['base_url'], token, options['concurrency'], options['timeout'])
+        corpus = loadgen.Corpus(words_per_doc=options['words_per_doc'])
+        report = {'base_url': options['base_url'], 'duration_s': options['duration'], 'scenarios': {}}
+        try:
+            if options['seed_docs'] > 0:
+                self.stdout.write(f"Seeding {options['seed_docs']} documents into '{options['collection']}'...")
+                report['seed'] = loadgen.seed(
+                    client,
+                    corpus,
+                    options['collection'],
+                    options['seed_docs'],
+                    options['concurrency'],
+                    options['index_timeout'],
+                )
+                self.stdout.write(f"seed {report['seed']}")
+            for scenario in options['scenario'] or ['ask']:
+                report['scenarios'][scenario] = self._ramp(scenario, client, corpus, rates, options)
+        finally:
+            client.close()
+            if fake is not None:
+                report['fake_openai'] = fake.stats
+                fake.stop()
+
+        self.stdout.write('')
+        for scenario, result in report['scenarios'].items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{scenario}: max sustained {result['max_sustained_rps']} rps, saturation at {result['saturation_rps']} rps"
+            ))
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
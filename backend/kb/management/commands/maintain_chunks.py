@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from kb.services import maintenance
+
+
+class Command(BaseCommand):
+    help = 'Report kb_chunk dead tuples and HNSW index bloat, then VACUUM or REINDEX CONCURRENTLY what needs it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would run.')
+        parser.add_argument('--force', action='store_true', help='Ignore the maintenance window and activity checks.')
+
+    def handle(self, *args, **options):
+        report = maintenance.run(force=options['force'], dry_run=options['dry_run'])
+        if not report:
+            self.stdout.write('Nothing to check (no PostgreSQL chunk databases, or another run holds the lock).')
+        for entry in report:
+            stats = entry['stats']
+            self.stdout.write(
+                f"{stats['alias']}: live={stats['live_tuples']} dead={stats['dead_tuples']} "
+                f"dead_ratio={stats['dead_ratio']} last_vacuum={stats['last_vacuum']}"
+            )
+            for index in stats['indexes']:
+                self.stdout.write(f"  {index['name']}: {index['bytes']} bytes, bloat={index['bloat']}")
+            if entry['skipped']:
+                self.stdout.write(self.style.WARNING(f"  deferred: {entry['skipped']}"))
+            for action in entry['actions']:
+                if options['dry_run'] or entry['skipped']:
+                    outcome = 'planned'
+                elif 'error' in action:
+                    outcome = f"failed: {action['error']}"
+                else:
+                    outcome = f"done in {action['seconds']}s"
+                self.stdout.write(f"  {action['action']} {action['target']} ({action['reason']}): {outcome}")
@@ -0,0 +1,92 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.models import Chunk, Document
+from kb.services import bulk_load, shards
+
+_CHUNK_FIELDS = (
+    'collection',
+    'chunk_index',
+    'text',
+    'span_start',
+    'span_end',
+    'vector_id',
+    'embedding',
+    'embed_model',
+    'embedding_next',
+)
+
+
+class Command(BaseCommand):
+    help = 'Move documents whose chunks are not on their hash-assigned vector shard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--drain',
+            action='append',
+            default=[],
+            help='Move every document off this shard before it is removed (repeatable).',
+        )
+        parser.add_argument('--collection', help='Only rebalance documents in this collection.')
+        parser.add_argument('--limit', type=int, help='Stop after moving this many documents.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only list the moves.')
+
+    def _move(self, document: Document, target: str, batch_size: int) -> int:
+        source = shards.chunk_alias(document)
+        rows = shards.chunks(document).order_by('chunk_index').values_list(*_CHUNK_FIELDS).iterator(
+            chunk_size=batch_size,
+        )
+        moved = 0
+        document.shard = target
+        # Copy first and switch the pointer after, so searches see the old copy until the new one is complete.
+        with shards.atomic(target):
+            shards.sync_document(document, target)
+            # Leftovers from an interrupted earlier move.
+            Chunk.objects.using(target).filter(document_id=document.id).delete()
+            while batch := list(islice(rows, batch_size)):
+                bulk_load.load_chunks(
+                    [Chunk(document_id=document.id, **dict(zip(_CHUNK_FIELDS, row))) for row in batch],
+                    batch_size=batch_size,
+                    using=target,
+                )
+                moved += len(batch)
+        Document.objects.filter(pk=document.pk).update(shard=target)
+        shards.drop_document(document, source)
+        return moved
+
+    def handle(self, *args, **options):
+        aliases = shards.shard_aliases()
+        if not aliases:
+            raise CommandError('No vector shards are configured (VECTOR_SHARD_URLS).')
+        unknown = set(options['drain']) - set(aliases)
+        if unknown:
+            raise CommandError(f"Unknown shards: {', '.join(sorted(unknown))}")
+        targets = [alias for alias in aliases if alias not in options['drain']]
+        if not targets:
+            raise CommandError('Cannot drain every shard.')
+
+        docs = Document.objects.filter(duplicate_of__isnull=True).order_by('id')
+        if options['collection']:
+            docs = docs.filter(collection=options['collection'])
+
+        moved_docs = 0
+        moved_chunks = 0
+        for document in docs.iterator():
+            source = shards.chunk_alias(document)
+            target = shards.target_shard(document.id, targets)
+            if source == target:
+                continue
+            if options['limit'] is not None and moved_docs >= options['limit']:
+                break
+            if options['dry_run']:
+                count = shards.chunks(document).count()
+            else:
+                count = self._move(document, target, options['batch_size'])
+            moved_docs += 1
+            moved_chunks += count
+            self.stdout.write(f"{document.id} {document.title}: {source} -> {target} ({count} chunks)")
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved_docs} documents, {moved_chunks} chunks"))
@@ -0,0 +1,76 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kb.models import EmbeddingMigration
+from kb.services import reembed
+from kb.tasks import reembed_task
+
+
+class Command(BaseCommand):
+    help = 'Re-embed every chunk with a new model in the background, then switch the live model atomically.'
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+        start = actions.add_parser('start', help='Begin dual-writing and re-embedding with TARGET_MODEL.')
+        start.add_argument('target_model')
+        start.add_argument('--foreground', action='store_true', help='Run the job here instead of on a worker.')
+        resume = actions.add_parser('resume', help='Continue a paused or failed migration from its checkpoint.')
+        resume.add_argument('--foreground', action='store_true', help='Run the job here instead of on a worker.')
+        actions.add_parser('pause', help='Stop the running job after its current batch.')
+        actions.add_parser('switch', help='Make the target model live once every chunk is covered.')
+        actions.add_parser('cancel', help='Abandon the migration and drop the new vectors.')
+        actions.add_parser('status', help='Show coverage, throughput and the live model.')
+
+    def _current(self) -> EmbeddingMigration:
+        migration = reembed.dual_write_migration()
+        if migration is None:
+            raise CommandError('No embedding migration is in progress.')
+        return migration
+
+    def _launch(self, migration: EmbeddingMigration, foreground: bool) -> None:
+        # Clears a pause, which the job would otherwise honour as soon as it starts.
+        EmbeddingMigration.objects.filter(pk=migration.pk).update(status=EmbeddingMigration.Status.PENDING)
+        if foreground:
+            migration = reembed.run(migration)
+            self.stdout.write(f"Migration {migration.id} is {migration.status}")
+            return
+        result = reembed_task.apply_async(
+            args=[migration.id],
+            queue=settings.REEMBED_QUEUE,
+            priority=settings.INDEX_PRIORITY_BULK,
+        )
+        self.stdout.write(f"Queued migration {migration.id} as task {result.id}")
+
+    def handle(self, *args, **options):
+        action = options['action']
+        try:
+            if action == 'start':
+                migration = reembed.start(options['target_model'])
+                self.stdout.write(
+                    f"Migration {migration.id}: {migration.source_model} -> {migration.target_model}, "
+                    f"{migration.chunks_total} chunks"
+                )
+                self._launch(migration, options['foreground'])
+            elif action == 'resume':
+                migration = self._current()
+                if migration.status == EmbeddingMigration.Status.READY:
+                    raise CommandError('Every chunk is already covered; run "reembed switch".')
+                self._launch(migration, options['foreground'])
+            elif action == 'pause':
+                migration = self._current()
+                EmbeddingMigration.objects.filter(pk=migration.pk).update(status=EmbeddingMigration.Status.PAUSED)
+                self.stdout.write(f"Pausing migration {migration.id} after its current batch")
+            elif action == 'switch':
+                switched = reembed.switch(self._current())
+                self.stdout.write(self.style.SUCCESS(
+                    f"{switched['model']} is live: {switched['swapped']} chunks, {switched['centroids']} centroids"
+                ))
+            elif action == 'cancel':
+                cleared = reembed.cancel(self._current())
+                self.stdout.write(f"Cancelled; cleared {cleared} pending vectors")
+            else:
+                self.stdout.write(json.dumps(reembed.report(), indent=2, default=str))
+        except ValueError as exc:
+            raise CommandError(str(exc))
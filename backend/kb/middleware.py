@@ -0,0 +1,20 @@
+import time
+
+from . import warmup
+
+
+class FirstRequestTimingMiddleware:
+    """Log how long the first request served by this process took."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pending = True
+
+    def __call__(self, request):
+        if not self.pending:
+            return self.get_response(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.pending = False
+        warmup.record_first_request(request.path, (time.perf_counter() - start) * 1000)
+        return response
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_title_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS kb_doc_title_prefix_idx '
+        'ON kb_document (UPPER(title::text) text_pattern_ops)'
+    )
+
+
+def drop_title_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS kb_doc_title_prefix_idx')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0003_chunk_embedding_pgvector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-created_at', '-id'], name='kb_doc_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='kb_doc_status_created_idx'),
+        ),
+        migrations.RunPython(create_title_prefix_index, drop_title_prefix_index),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0004_document_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='indexjob',
+            name='celery_task_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='indexjob',
+            name='chunks_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='indexjob',
+            name='chunks_embedded',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='indexjob',
+            name='chunks_written',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.core.validators import RegexValidator
+from django.db import migrations, models
+
+
+def create_default_collection_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Partial HNSW index for the default collection; see vector_store.collection_index_name.
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS kb_chunk_hnsw_7505d64a54e0 ON kb_chunk '
+        "USING hnsw (embedding vector_cosine_ops) WHERE collection = 'default'"
+    )
+
+
+def drop_default_collection_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS kb_chunk_hnsw_7505d64a54e0')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0007_document_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='collection',
+            field=models.CharField(
+                db_index=True,
+                default='default',
+                max_length=64,
+                validators=[
+                    RegexValidator(
+                        '^[A-Za-z0-9_-]{1,64}$',
+                        'Collection names may only contain letters, digits, "_" and "-".',
+                    )
+                ],
+            ),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='collection',
+            field=models.CharField(default='default', max_length=64),
+        ),
+        migrations.RunPython(create_default_collection_index, drop_default_collection_index),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0008_collections'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexjob',
+            name='embedding_tokens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='indexjob',
+            name='cost_usd',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
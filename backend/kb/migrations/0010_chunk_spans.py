@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0009_indexjob_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='source_compressed',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='span_start',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='span_end',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from pgvector.django import VectorField
+
+
+def create_document_embedding_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS kb_document_embedding_hnsw ON kb_document '
+        'USING hnsw (embedding vector_cosine_ops)'
+    )
+
+
+def drop_document_embedding_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS kb_document_embedding_hnsw')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0010_chunk_spans'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='embedding',
+            field=VectorField(blank=True, dimensions=1536, null=True),
+        ),
+        migrations.RunPython(create_document_embedding_index, drop_document_embedding_index),
+    ]
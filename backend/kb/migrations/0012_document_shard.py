@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0011_document_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='shard',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
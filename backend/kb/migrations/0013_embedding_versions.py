@@ -0,0 +1,43 @@
+from django.db import migrations, models
+from pgvector.django import VectorField
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0012_document_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunk',
+            name='embed_model',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.AddField(
+            model_name='chunk',
+            name='embedding_next',
+            field=VectorField(blank=True, dimensions=1536, null=True),
+        ),
+        migrations.CreateModel(
+            name='EmbeddingMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_model', models.CharField(max_length=128)),
+                ('target_model', models.CharField(max_length=128)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('PAUSED', 'Paused'), ('READY', 'Ready'), ('SWITCHED', 'Switched'), ('CANCELLED', 'Cancelled'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('checkpoints', models.JSONField(blank=True, default=dict)),
+                ('celery_task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('chunks_total', models.IntegerField(default=0)),
+                ('chunks_scanned', models.IntegerField(default=0)),
+                ('chunks_embedded', models.IntegerField(default=0)),
+                ('embedding_tokens', models.IntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0.0)),
+                ('elapsed_s', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('switched_at', models.DateTimeField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+            ],
+        ),
+    ]
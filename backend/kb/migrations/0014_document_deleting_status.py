@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('kb', '0013_embedding_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('UPLOADED', 'Uploaded'),
+                    ('INDEXING', 'Indexing'),
+                    ('INDEXED', 'Indexed'),
+                    ('FAILED', 'Failed'),
+                    ('DELETING', 'Deleting'),
+                ],
+                default='UPLOADED',
+                max_length=20,
+            ),
+        ),
+    ]
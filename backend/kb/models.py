@@ -1,6 +1,14 @@
-﻿from django.db import models
+﻿from django.core.validators import RegexValidator
+from django.db import models
 from pgvector.django import VectorField
 
+DEFAULT_COLLECTION = 'default'
+
+validate_collection = RegexValidator(
+    r'^[A-Za-z0-9_-]{1,64}$',
+    'Collection names may only contain letters, digits, "_" and "-".',
+)
+
 
 class Document(models.Model):
     class Status(models.TextChoices):
@@ -8,16 +16,49 @@ class Document(models.Model):
         INDEXING = 'INDEXING', 'Indexing'
         INDEXED = 'INDEXED', 'Indexed'
         FAILED = 'FAILED', 'Failed'
+        # Hidden from listings and search while a worker removes its chunks in batches.
+        DELETING = 'DELETING', 'Deleting'
 
     title = models.CharField(max_length=255)
+    collection = models.CharField(
+        max_length=64,
+        default=DEFAULT_COLLECTION,
+        db_index=True,
+        validators=[validate_collection],
+    )
     file = models.FileField(upload_to='docs/', null=True, blank=True)
     original_filename = models.CharField(max_length=255, null=True, blank=True)
     raw_text = models.TextField(null=True, blank=True)
+    # zlib-compressed source for span chunks when SOURCE_COMPRESSION is on (raw_text is then empty).
+    source_compressed = models.BinaryField(null=True, blank=True, editable=False)
+    spool_path = models.CharField(max_length=512, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    duplicate_of = models.ForeignKey(
+        'self',
+        related_name='duplicates',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.UPLOADED)
     chunks_count = models.IntegerField(default=0)
     last_indexed_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
+    # Normalized centroid of the chunk embeddings; routes questions to documents before chunk search.
+    embedding = VectorField(dimensions=1536, null=True, blank=True)
+    # Database alias holding this document's chunks; empty means the primary (see kb.services.shards).
+    shard = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='kb_doc_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='kb_doc_status_created_idx'),
+            # Cover the list view's Count/Max(updated_at) ETag aggregate as an index-only scan.
+            models.Index(fields=['status', 'updated_at'], name='kb_doc_status_updated_idx'),
+            models.Index(fields=['collection', 'status', 'updated_at'], name='kb_doc_coll_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.status})"
@@ -25,10 +66,19 @@ class Document(models.Model):
 
 class Chunk(models.Model):
     document = models.ForeignKey(Document, related_name='chunks', on_delete=models.CASCADE)
+    # Denormalized from Document so vector search can use per-collection partial indexes.
+    collection = models.CharField(max_length=64, default=DEFAULT_COLLECTION)
     chunk_index = models.IntegerField()
     text = models.TextField()
+    # With CHUNK_STORAGE=spans, text is empty and the chunk is source[span_start:span_end].
+    span_start = models.IntegerField(null=True, blank=True)
+    span_end = models.IntegerField(null=True, blank=True)
     vector_id = models.CharField(max_length=64, unique=True)
     embedding = VectorField(dimensions=1536, null=True, blank=True)
+    # Model that produced ``embedding``; empty for chunks embedded before models were recorded.
+    embed_model = models.CharField(max_length=128, null=True, blank=True)
+    # Vector from the model being migrated to; swapped into ``embedding`` when the migration switches.
+    embedding_next = VectorField(dimensions=1536, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -50,7 +100,44 @@ class IndexJob(models.Model):
     started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
-    celery_task_id = models.CharField(max_length=255, null=True, blank=True)
+    celery_task_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    chunks_total = models.IntegerField(default=0)
+    chunks_embedded = models.IntegerField(default=0)
+    chunks_written = models.IntegerField(default=0)
+    embedding_tokens = models.IntegerField(default=0)
+    cost_usd = models.FloatField(default=0.0)
 
     def __str__(self):
         return f"Job {self.id} for {self.document_id} ({self.status})"
+
+
+class EmbeddingMigration(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        PAUSED = 'PAUSED', 'Paused'
+        READY = 'READY', 'Ready'
+        SWITCHED = 'SWITCHED', 'Switched'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+        FAILED = 'FAILED', 'Failed'
+
+    source_model = models.CharField(max_length=128)
+    target_model = models.CharField(max_length=128)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    # Last chunk id re-embedded per database alias; a resumed run continues after it.
+    checkpoints = models.JSONField(default=dict, blank=True)
+    celery_task_id = models.CharField(max_length=255, null=True, blank=True)
+    chunks_total = models.IntegerField(default=0)
+    chunks_scanned = models.IntegerField(default=0)
+    chunks_embedded = models.IntegerField(default=0)
+    embedding_tokens = models.IntegerField(default=0)
+    cost_usd = models.FloatField(default=0.0)
+    elapsed_s = models.FloatField(default=0.0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    switched_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.source_model} -> {self.target_model} ({self.status})"
@@ -1,14 +1,39 @@
 ﻿import hashlib
+import itertools
+import logging
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from django.conf import settings
-from django.db import transaction
+from django.db import router, transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import Chunk, Document
-from .services import chunking, guardrails, llm_client, parsers, vector_store
+from .models import DEFAULT_COLLECTION, Chunk, Document
+from .routers import replica_reads
+from .services import (
+    bulk_load,
+    chunking,
+    extraction_cache,
+    guardrails,
+    llm_client,
+    mmr as mmr_service,
+    reembed,
+    routing,
+    shards,
+    uploads,
+    spans,
+    usage as usage_service,
+    vector_store,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PromptBudgetExceeded(ValueError):
+    pass
 
 
 def _chunk_vector_id(doc_id: int, chunk_index: int, chunk_text: str) -> str:
@@ -21,28 +46,121 @@ def _batch_iter(items: List[str], batch_size: int):
         yield items[i:i + batch_size]
 
 
-def index_document(document: Document) -> dict:
+def _no_progress(**counts):
+    return None
+
+
+def find_canonical_document(content_hash: str | None, collection: str = DEFAULT_COLLECTION) -> Document | None:
+    if not settings.DEDUPE_UPLOADS or not content_hash:
+        return None
+    # Scoped per collection: chunks are only shared within one partition.
+    return (
+        Document.objects.filter(content_hash=content_hash, collection=collection, duplicate_of__isnull=True)
+        # A document being deleted would leave the new upload with neither chunks nor a source.
+        .exclude(status__in=[Document.Status.FAILED, Document.Status.DELETING])
+        .order_by('id')
+        .first()
+    )
+
+
+def release_document(document: Document) -> bool:
+    # Hand shared chunks to the oldest duplicate so deleting the canonical copy keeps them.
+    successor = document.duplicates.exclude(status=Document.Status.DELETING).order_by('id').first()
+    if successor is None:
+        return False
+    alias = shards.chunk_alias(document)
+    owned = shards.chunks(document)
+    with transaction.atomic(), shards.atomic(alias):
+        has_spans = owned.filter(span_start__isnull=False).exists()
+        document.duplicates.exclude(pk=successor.pk).update(duplicate_of=successor)
+        successor.duplicate_of = None
+        successor.embedding = document.embedding
+        successor.shard = document.shard
+        update_fields = ['duplicate_of', 'embedding', 'shard', 'updated_at']
+        if has_spans or (not successor.raw_text and not successor.file and not successor.spool_path):
+            # Diskless duplicates carry no source, and span chunks slice their owner's copy; inherit it.
+            successor.raw_text = document.raw_text
+            successor.source_compressed = document.source_compressed
+            successor.spool_path = document.spool_path
+            document.spool_path = None
+            update_fields.extend(['raw_text', 'source_compressed', 'spool_path'])
+        successor.save(update_fields=update_fields)
+        # On a shard the successor's mirrored row must exist before the chunks can point at it.
+        shards.sync_document(successor, alias)
+        owned.update(document=successor)
+        if alias != shards.PRIMARY:
+            shards.drop_document(document, alias)
+    return True
+
+
+def delete_document(document: Document) -> int:
+    """Remove a document, its chunks and its stored files; returns the number of chunks deleted."""
+    deleted = 0
+    if not release_document(document):
+        deleted = vector_store.delete_document_chunks(document.id, using=shards.chunk_alias(document))
+        if document.shard:
+            # document.delete() below only cascades on the primary; drop the shard's mirrored row too.
+            shards.drop_document(document)
+    if document.file:
+        document.file.delete(save=False)
+    uploads.discard_spool(document.spool_path)
+    document.delete()
+    return deleted
+
+
+def _index_duplicate(document: Document, report, usage: dict | None) -> dict:
+    canonical = document.duplicate_of
+    if canonical.status != Document.Status.INDEXED:
+        # Indexing the canonical copy also marks every duplicate as indexed.
+        return index_document(canonical, progress=report, usage=usage)
+
+    report(parsed=canonical.chunks_count, written=canonical.chunks_count)
+    now = timezone.now()
+    updated = Document.objects.filter(pk=document.pk).exclude(status=Document.Status.DELETING).update(
+        status=Document.Status.INDEXED,
+        chunks_count=canonical.chunks_count,
+        last_indexed_at=now,
+        error_message=None,
+        spool_path=None,
+        updated_at=now,
+    )
+    if not updated:
+        return {'chunks': 0, 'deleting': True}
+    uploads.discard_spool(document.spool_path)
+    return {'chunks': canonical.chunks_count, 'duplicate_of': canonical.id}
+
+
+def index_document(document: Document, progress=None, usage: dict | None = None) -> dict:
+    report = progress or _no_progress
+    if document.duplicate_of_id:
+        return _index_duplicate(document, report, usage)
     use_pgvector = vector_store.uses_pgvector()
-    if document.raw_text:
-        text = document.raw_text
-    elif document.file:
-        text = parsers.load_text(document.file.path)
-    else:
-        raise ValueError('No source text available for indexing.')
-    chunks = chunking.chunk_text(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    store_spans = settings.CHUNK_STORAGE == 'spans'
+    text = spans.source_text(document)
+    if not text:
+        # The stored upload and the spool are byte-identical to what content_hash was taken over.
+        if document.file:
+            text = extraction_cache.load_text(document.file.path, document.content_hash)
+        elif document.spool_path:
+            text = extraction_cache.load_text(document.spool_path, document.content_hash)
+        else:
+            raise ValueError('No source text available for indexing.')
+    chunk_spans = chunking.chunk_spans(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    chunks = [text[start:end] for start, end in chunk_spans]
+    report(parsed=len(chunks))
 
-    existing_ids = list(document.chunks.values_list('vector_id', flat=True))
-    if existing_ids:
-        if not use_pgvector:
-            vector_store.delete_chunks(existing_ids)
-        document.chunks.all().delete()
+    current = shards.chunk_alias(document)
+    placement = shards.assign(document)
+    vector_store.delete_document_chunks(document.id, using=current)
+    if current != placement:
+        shards.drop_document(document, current)
 
     chunk_records = []
     ids = []
     documents = []
     metadatas = []
 
-    for idx, chunk_text in enumerate(chunks):
+    for idx, (chunk_text, (span_start, span_end)) in enumerate(zip(chunks, chunk_spans)):
         vector_id = _chunk_vector_id(document.id, idx, chunk_text)
         ids.append(vector_id)
         documents.append(chunk_text)
@@ -51,24 +169,33 @@ def index_document(document: Document) -> dict:
             'doc_id': document.id,
             'doc_title': document.title,
             'doc_filename': filename,
+            'doc_content_hash': document.content_hash,
             'chunk_index': idx,
         })
         chunk_records.append(Chunk(
             document=document,
+            collection=document.collection,
             chunk_index=idx,
-            text=chunk_text,
+            text='' if store_spans else chunk_text,
+            span_start=span_start if store_spans else None,
+            span_end=span_end if store_spans else None,
             vector_id=vector_id,
         ))
 
+    # Fresh reads: a cached model could store source-model vectors for a while after a switch.
+    embed_model = reembed.active_model(fresh=True)
+    # While a model migration runs, new chunks get both vectors so coverage never slips behind.
+    migration = reembed.dual_write_migration() if use_pgvector else None
     embeddings = []
+    next_embeddings = []
     if ids:
         for batch_docs in _batch_iter(documents, 64):
-            embeddings.extend(llm_client.embed_texts(batch_docs))
+            embeddings.extend(llm_client.embed_texts(batch_docs, usage=usage, model=embed_model))
+            if migration is not None:
+                next_embeddings.extend(llm_client.embed_texts(batch_docs, usage=usage, model=migration.target_model))
+            report(embedded=len(embeddings))
 
-        if use_pgvector:
-            for chunk_record, embedding in zip(chunk_records, embeddings):
-                chunk_record.embedding = embedding
-        else:
+        if not use_pgvector:
             for batch_docs, batch_ids, batch_metas, batch_embeddings in zip(
                 _batch_iter(documents, 64),
                 _batch_iter(ids, 64),
@@ -77,79 +204,179 @@ def index_document(document: Document) -> dict:
             ):
                 vector_store.upsert_chunks(batch_ids, batch_embeddings, batch_docs, batch_metas)
 
-    with transaction.atomic():
-        if chunk_records:
-            Chunk.objects.bulk_create(chunk_records)
-
+    if migration is not None and reembed.active_model(fresh=True) == migration.target_model:
+        # The switch landed while this document was being embedded.
+        embed_model, embeddings, next_embeddings = migration.target_model, next_embeddings, []
+    for record, next_embedding in itertools.zip_longest(chunk_records, next_embeddings):
+        record.embed_model = embed_model if use_pgvector else None
+        record.embedding_next = next_embedding
+
+    with transaction.atomic(), shards.atomic(placement):
+        # The row lock orders this against a delete claim: either the claim waits for this commit and then
+        # removes these chunks, or it landed first and nothing is written.
+        claimable = Document.objects.select_for_update().filter(pk=document.pk).exclude(
+            status=Document.Status.DELETING,
+        )
+        if not claimable.exists():
+            return {'chunks': 0, 'deleting': True}
         document.status = Document.Status.INDEXED
         document.chunks_count = len(chunk_records)
         document.last_indexed_at = timezone.now()
         document.error_message = None
-        if settings.DISCARD_RAW_TEXT_AFTER_INDEX and document.raw_text:
+        document.embedding = routing.centroid(embeddings) if use_pgvector and embeddings else None
+        update_fields = ['status', 'chunks_count', 'last_indexed_at', 'error_message', 'embedding', 'updated_at']
+        spool_path = document.spool_path
+        if spool_path:
+            document.spool_path = None
+            update_fields.append('spool_path')
+        if store_spans:
+            # Span chunks are sliced from this copy, so it is kept even when discarding raw text.
+            update_fields.extend(spans.store_source(document, text))
+        elif spool_path:
+            # Parsed from the upload spool: keep the text for reindexing unless discarding.
+            document.raw_text = None if settings.DISCARD_RAW_TEXT_AFTER_INDEX else text
+            update_fields.append('raw_text')
+        elif settings.DISCARD_RAW_TEXT_AFTER_INDEX and document.raw_text:
             document.raw_text = None
-            document.save(update_fields=['status', 'chunks_count', 'last_indexed_at', 'error_message', 'raw_text'])
-        else:
-            document.save(update_fields=['status', 'chunks_count', 'last_indexed_at', 'error_message'])
+            update_fields.append('raw_text')
+        shards.sync_document(document, placement)
+        if chunk_records:
+            bulk_load.load_chunks(chunk_records, embeddings if use_pgvector else None, using=placement)
+        document.save(update_fields=update_fields)
+        document.duplicates.exclude(status=Document.Status.DELETING).update(
+            status=Document.Status.INDEXED,
+            chunks_count=document.chunks_count,
+            last_indexed_at=document.last_indexed_at,
+            error_message=None,
+            updated_at=document.last_indexed_at,
+        )
+    uploads.discard_spool(spool_path)
+    report(written=len(chunk_records))
 
     return {'chunks': len(chunk_records)}
 
 
-def retrieve(
-    question: str,
-    top_k: int | None = None,
-    doc_ids: list[int] | None = None,
-    with_trace: bool = False,
-):
+def _retrieval_options(
+    top_k: int | None,
+    mmr: bool | None,
+    mmr_lambda: float | None,
+    fetch_k: int | None,
+    collection: str | None,
+    route_docs: int | None = None,
+) -> dict:
     top_k = top_k or settings.TOP_K_DEFAULT
-    trace_steps = []
-    where = None
-
-    if doc_ids is not None:
-        if not doc_ids:
-            hits = []
-            if with_trace:
-                trace_steps.append({
-                    'name': 'Document filter',
-                    'ms': 0.0,
-                    'detail': 'no documents selected',
-                })
-                return hits, {
-                    'top_k': top_k,
-                    'hits': len(hits),
-                    'steps': trace_steps,
-                    'doc_ids': [],
-                }
-            return hits
-        where = {'doc_id': {'$in': doc_ids}}
+    return {
+        'top_k': top_k,
+        'collection': collection or DEFAULT_COLLECTION,
+        'mmr': settings.MMR_ENABLED if mmr is None else mmr,
+        'mmr_lambda': settings.MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+        'fetch_k': max(fetch_k or settings.MMR_FETCH_K, top_k),
+        'route_docs': settings.DOC_ROUTING_TOP_N if route_docs is None else route_docs,
+    }
+
+
+def _document_filter(doc_ids: list[int] | None, options: dict, trace_steps: list) -> dict | None:
+    # Returns the vector store ``where`` clause, or None when an empty selection rules out every hit.
+    where = {'collection': options['collection']}
+    if doc_ids is None:
+        return where
+    if not doc_ids:
         trace_steps.append({
             'name': 'Document filter',
             'ms': 0.0,
-            'detail': f"doc_ids={','.join(str(doc_id) for doc_id in doc_ids)}",
+            'detail': 'no documents selected',
         })
-
-    embed_start = time.perf_counter()
-    embedding = llm_client.embed_texts([question])[0]
-    embed_end = time.perf_counter()
+        return None
+    # Duplicates share the chunks of their canonical document.
+    canonical_ids = {
+        duplicate_of or doc_id
+        for doc_id, duplicate_of in Document.objects.filter(id__in=doc_ids).values_list('id', 'duplicate_of_id')
+    }
+    where['doc_id'] = {'$in': sorted(canonical_ids)}
     trace_steps.append({
-        'name': 'Embed question',
-        'ms': round((embed_end - embed_start) * 1000, 2),
-        'detail': f"model={settings.EMBED_MODEL}",
+        'name': 'Document filter',
+        'ms': 0.0,
+        'detail': f"doc_ids={','.join(str(doc_id) for doc_id in doc_ids)}",
     })
+    return where
 
-    query_start = time.perf_counter()
-    results = vector_store.query(embedding, top_k, where=where)
-    query_end = time.perf_counter()
+
+def _routing_applies(where: dict, options: dict) -> bool:
+    doc_filter = where.get('doc_id')
+    # An explicit selection no larger than the routing fan-out is already as narrow as routing would make it.
+    return bool(options['route_docs']) and not (doc_filter and len(doc_filter['$in']) <= options['route_docs'])
+
+
+def _routed_where(where: dict, candidates: list[tuple[int, float]]) -> dict:
+    if not candidates:
+        # No document embeddings yet (run compute_document_embeddings); search every chunk.
+        return where
+    return {**where, 'doc_id': {'$in': sorted(doc_id for doc_id, _ in candidates)}}
+
+
+def _candidate_docs(candidates: list[tuple[int, float]]) -> list[dict]:
+    return [{'doc_id': doc_id, 'distance': round(distance, 4)} for doc_id, distance in candidates]
+
+
+def _route_documents(embedding, where: dict, options: dict, trace_steps: list):
+    # Returns (where, candidates): chunk search is narrowed to the nearest documents by centroid.
+    if not _routing_applies(where, options):
+        return where, None
+    route_start = time.perf_counter()
+    candidates = vector_store.query_documents(embedding, options['route_docs'], where=where)
+    route_end = time.perf_counter()
     trace_steps.append({
-        'name': 'Vector search',
-        'ms': round((query_end - query_start) * 1000, 2),
-        'detail': f"top_k={top_k}",
+        'name': 'Document routing',
+        'ms': round((route_end - route_start) * 1000, 2),
+        'detail': f"top_n={options['route_docs']} candidates={len(candidates)}"
+        + ('' if candidates else ' fallback=all_chunks'),
     })
+    return _routed_where(where, candidates), candidates
+
+
+def _search_limit(options: dict) -> int:
+    return options['fetch_k'] if options['mmr'] else options['top_k']
+
+
+def _search_detail(options: dict, results: dict) -> str:
+    search_limit = f"fetch_k={options['fetch_k']}" if options['mmr'] else f"top_k={options['top_k']}"
+    return (
+        f"{search_limit} collection={options['collection']} "
+        f"passes={results['search_passes']} db={results['database']}"
+    )
+
+
+def _select_hits(embedding, results: dict, options: dict, trace_steps: list) -> list[dict]:
+    if options['mmr']:
+        mmr_start = time.perf_counter()
+        candidates = len(results['documents'])
+        selected = mmr_service.mmr_select(embedding, results['embeddings'], options['top_k'], options['mmr_lambda'])
+        results = {
+            key: [results[key][idx] for idx in selected]
+            for key in ('documents', 'metadatas', 'distances')
+        }
+        mmr_end = time.perf_counter()
+        trace_steps.append({
+            'name': 'MMR rerank',
+            'ms': round((mmr_end - mmr_start) * 1000, 2),
+            'detail': f"lambda={options['mmr_lambda']} candidates={candidates} selected={len(selected)}",
+        })
 
     assemble_start = time.perf_counter()
     hits = []
+    seen_content = set()
+    collapsed = 0
     for doc, meta, distance in zip(results['documents'], results['metadatas'], results['distances']):
+        content_hash = meta.get('doc_content_hash')
+        if content_hash:
+            content_key = (content_hash, meta.get('chunk_index'))
+            if content_key in seen_content:
+                collapsed += 1
+                continue
+            seen_content.add(content_key)
         hits.append({
             'text': doc,
+            'doc_id': meta.get('doc_id'),
             'doc_title': meta.get('doc_title'),
             'filename': meta.get('doc_filename'),
             'chunk_index': meta.get('chunk_index'),
@@ -159,56 +386,250 @@ def retrieve(
     trace_steps.append({
         'name': 'Assemble hits',
         'ms': round((assemble_end - assemble_start) * 1000, 2),
-        'detail': f"hits={len(hits)}",
+        'detail': f"hits={len(hits)} duplicates_collapsed={collapsed}",
     })
+    return hits
 
-    if with_trace:
-        return hits, {
-            'top_k': top_k,
-            'hits': len(hits),
-            'steps': trace_steps,
-            'doc_ids': doc_ids,
-        }
 
-    return hits
+@replica_reads()
+def lookup_chunks(refs: list[tuple[int, int]]) -> list[dict]:
+    """Text of the chunks named by ``(doc_id, chunk_index)`` source references, in request order.
+
+    References to documents or chunks that no longer exist are left out of the result.
+    """
+    documents = Document.objects.filter(id__in={doc_id for doc_id, _ in refs}).only('id', 'duplicate_of_id')
+    # Duplicates share their canonical document's chunks.
+    owners = {doc.id: doc.duplicate_of_id or doc.id for doc in documents}
+    wanted = {}
+    for doc_id, chunk_index in refs:
+        if doc_id in owners:
+            wanted.setdefault(owners[doc_id], set()).add(chunk_index)
+    placements = {}
+    for doc in Document.objects.filter(id__in=wanted).only('id', 'shard'):
+        alias = shards.chunk_alias(doc)
+        placements.setdefault(router.db_for_read(Chunk) if alias == shards.PRIMARY else alias, []).append(doc.id)
+
+    found = {}
+    for alias, owner_ids in placements.items():
+        lookup = Q()
+        for owner_id in owner_ids:
+            lookup |= Q(document_id=owner_id, chunk_index__in=wanted[owner_id])
+        chunks = list(
+            Chunk.objects.using(alias).filter(lookup)
+            .only('id', 'document_id', 'chunk_index', 'text', 'span_start', 'span_end')
+            .annotate(span_text=spans.span_text_expression())
+        )
+        for chunk, text in zip(chunks, spans.chunk_texts(chunks)):
+            found[(chunk.document_id, chunk.chunk_index)] = text
+
+    results = []
+    for doc_id, chunk_index in refs:
+        text = found.get((owners.get(doc_id), chunk_index))
+        if text is not None:
+            results.append({'doc_id': doc_id, 'chunk_index': chunk_index, 'text': text})
+    return results
+
+
+def _retrieval_trace(
+    options: dict,
+    hits: list[dict],
+    trace_steps: list,
+    doc_ids: list[int] | None,
+    candidates: list[tuple[int, float]] | None = None,
+) -> dict:
+    return {
+        'top_k': options['top_k'],
+        'hits': len(hits),
+        'steps': trace_steps,
+        'doc_ids': doc_ids,
+        'collection': options['collection'],
+        'mmr': options['mmr'],
+        'candidate_docs': _candidate_docs(candidates) if candidates is not None else None,
+    }
 
 
-def answer_question(
+@replica_reads()
+def retrieve(
     question: str,
     top_k: int | None = None,
     doc_ids: list[int] | None = None,
-    explain: bool = False,
-) -> dict:
-    total_start = time.perf_counter()
-    trace = None
-    if explain:
-        hits, trace = retrieve(question, top_k=top_k, doc_ids=doc_ids, with_trace=True)
-    else:
-        hits = retrieve(question, top_k=top_k, doc_ids=doc_ids)
+    with_trace: bool = False,
+    mmr: bool | None = None,
+    mmr_lambda: float | None = None,
+    fetch_k: int | None = None,
+    collection: str | None = None,
+    usage: dict | None = None,
+    route_docs: int | None = None,
+):
+    options = _retrieval_options(top_k, mmr, mmr_lambda, fetch_k, collection, route_docs)
+    usage = usage if usage is not None else usage_service.new_usage()
+    trace_steps = []
+
+    where = _document_filter(doc_ids, options, trace_steps)
+    if where is None:
+        hits = []
+        if with_trace:
+            return hits, _retrieval_trace(options, hits, trace_steps, [])
+        return hits
+
+    embed_start = time.perf_counter()
+    tokens_before = usage['embedding_tokens']
+    embed_model = reembed.active_model()
+    embedding = llm_client.embed_texts([question], usage=usage, model=embed_model)[0]
+    embed_end = time.perf_counter()
+    trace_steps.append({
+        'name': 'Embed question',
+        'ms': round((embed_end - embed_start) * 1000, 2),
+        'detail': f"model={embed_model} tokens={usage['embedding_tokens'] - tokens_before}",
+    })
+
+    where, candidates = _route_documents(embedding, where, options, trace_steps)
+
+    query_start = time.perf_counter()
+    results = vector_store.query(
+        embedding,
+        _search_limit(options),
+        where=where,
+        include_embeddings=options['mmr'],
+    )
+    query_end = time.perf_counter()
+    trace_steps.append({
+        'name': 'Vector search',
+        'ms': round((query_end - query_start) * 1000, 2),
+        'detail': _search_detail(options, results),
+    })
+
+    hits = _select_hits(embedding, results, options, trace_steps)
+
+    if with_trace:
+        return hits, _retrieval_trace(options, hits, trace_steps, doc_ids, candidates)
+
+    return hits
+
+
+def _gate_hits(hits: list[dict], max_distance: float | None, trace: dict | None) -> list[dict]:
+    if max_distance is None or not hits:
+        return hits
+    gate_start = time.perf_counter()
+    kept = [hit for hit in hits if hit['score'] <= max_distance]
+    gate_end = time.perf_counter()
+    best = min(hit['score'] for hit in hits)
+    logger.info(
+        'Relevance gate: max_distance=%s best=%.4f kept=%d dropped=%d',
+        max_distance,
+        best,
+        len(kept),
+        len(hits) - len(kept),
+    )
+    if trace is not None:
+        trace['steps'].append({
+            'name': 'Relevance gate',
+            'ms': round((gate_end - gate_start) * 1000, 2),
+            'detail': f"max_distance={max_distance} best={best:.4f} kept={len(kept)} dropped={len(hits) - len(kept)}",
+        })
+    return kept
+
+
+def _max_distance(max_distance: float | None) -> float | None:
+    return settings.RELEVANCE_MAX_DISTANCE if max_distance is None else max_distance
+
+
+def _prompt_budget(max_prompt_tokens: int | None) -> int | None:
+    budget = settings.ASK_MAX_PROMPT_TOKENS or None
+    if max_prompt_tokens is None:
+        return budget
+    # A request may tighten the server budget, never loosen it.
+    return min(max_prompt_tokens, budget) if budget else max_prompt_tokens
+
+
+def _estimate_prompt(system_prompt: str, user_prompt: str) -> int:
+    return usage_service.estimate_tokens(system_prompt) + usage_service.estimate_tokens(user_prompt)
+
+
+def _fit_prompt_budget(question: str, hits: list[dict], system_prompt: str, budget: int | None, trace: dict | None):
+    # Returns (hits, user_prompt, estimated_tokens) with the prompt trimmed to the token budget.
+    user_prompt = guardrails.user_prompt(question, guardrails.build_context(hits))
+    estimated = _estimate_prompt(system_prompt, user_prompt)
+    if budget is None or estimated <= budget:
+        return hits, user_prompt, estimated
+    if settings.ASK_PROMPT_BUDGET_MODE == 'reject':
+        raise PromptBudgetExceeded(f"prompt needs about {estimated} tokens; the budget is {budget}")
+
+    original = estimated
+    kept = list(hits)
+    truncated = False
+    # Hits are ranked, so the least relevant context goes first.
+    while len(kept) > 1 and estimated > budget:
+        kept.pop()
+        user_prompt = guardrails.user_prompt(question, guardrails.build_context(kept))
+        estimated = _estimate_prompt(system_prompt, user_prompt)
+    if estimated > budget:
+        text = kept[0]['text']
+        overflow_chars = (estimated - budget) * usage_service.CHARS_PER_TOKEN
+        if overflow_chars >= len(text):
+            raise PromptBudgetExceeded(f"question and instructions alone exceed the budget of {budget} tokens")
+        kept[0] = {**kept[0], 'text': text[:len(text) - overflow_chars]}
+        truncated = True
+        user_prompt = guardrails.user_prompt(question, guardrails.build_context(kept))
+        estimated = _estimate_prompt(system_prompt, user_prompt)
+    if trace is not None:
+        trace['steps'].append({
+            'name': 'Prompt budget',
+            'ms': 0.0,
+            'detail': (
+                f"estimated={original} budget={budget} dropped={len(hits) - len(kept)} "
+                f"truncated={truncated}"
+            ),
+        })
+    return kept, user_prompt, estimated
+
 
+def _answer_from_hits(
+    question: str,
+    hits: list[dict],
+    trace: dict | None,
+    total_start: float,
+    max_distance: float | None = None,
+    max_prompt_tokens: int | None = None,
+    usage: dict | None = None,
+) -> dict:
+    usage = usage if usage is not None else usage_service.new_usage()
+    retrieved = len(hits)
+    hits = _gate_hits(hits, max_distance, trace)
+    # Gated: retrieval found something, but nothing was close enough to spend an LLM call on.
+    gated = retrieved > 0 and not hits
     if not hits:
         result = {
             'answer': guardrails.REFUSAL_TEXT,
             'sources': [],
+            'gated': gated,
         }
-        if explain and trace is not None:
+        if trace is not None:
             trace['steps'].append({
                 'name': 'Guardrail refusal',
                 'ms': 0.0,
-                'detail': 'no relevant context',
+                'detail': 'below relevance threshold' if gated else 'no relevant context',
             })
             trace['total_ms'] = round((time.perf_counter() - total_start) * 1000, 2)
+            trace['usage'] = usage
             result['trace'] = trace
         return result
 
     context_start = time.perf_counter()
-    context = guardrails.build_context(hits)
-    context_end = time.perf_counter()
     system_prompt = guardrails.system_prompt()
-    user_prompt = guardrails.user_prompt(question, context)
+    hits, user_prompt, estimated_tokens = _fit_prompt_budget(
+        question,
+        hits,
+        system_prompt,
+        _prompt_budget(max_prompt_tokens),
+        trace,
+    )
+    context_end = time.perf_counter()
 
     llm_start = time.perf_counter()
-    answer = llm_client.chat_complete(system_prompt, user_prompt)
+    prompt_before = usage['prompt_tokens']
+    completion_before = usage['completion_tokens']
+    answer = llm_client.chat_complete(system_prompt, user_prompt, usage=usage)
     llm_end = time.perf_counter()
     if not answer:
         answer = guardrails.REFUSAL_TEXT
@@ -220,6 +641,7 @@ def answer_question(
     for idx, hit in enumerate(hits, start=1):
         sources.append({
             'citation': idx,
+            'doc_id': hit['doc_id'],
             'doc_title': hit['doc_title'],
             'filename': hit['filename'],
             'chunk_index': hit['chunk_index'],
@@ -231,19 +653,23 @@ def answer_question(
     result = {
         'answer': answer,
         'sources': sources,
+        'gated': False,
     }
 
-    if explain and trace is not None:
+    if trace is not None:
         trace['steps'].extend([
             {
                 'name': 'Build context',
                 'ms': round((context_end - context_start) * 1000, 2),
-                'detail': f"chunks={len(hits)}",
+                'detail': f"chunks={len(hits)} estimated_tokens={estimated_tokens}",
             },
             {
                 'name': 'LLM answer',
                 'ms': round((llm_end - llm_start) * 1000, 2),
-                'detail': f"model={settings.CHAT_MODEL}",
+                'detail': (
+                    f"model={settings.CHAT_MODEL} prompt_tokens={usage['prompt_tokens'] - prompt_before} "
+                    f"completion_tokens={usage['completion_tokens'] - completion_before}"
+                ),
             },
             {
                 'name': 'Assemble sources',
@@ -252,6 +678,167 @@ def answer_question(
             },
         ])
         trace['total_ms'] = round((time.perf_counter() - total_start) * 1000, 2)
+        trace['usage'] = usage
         result['trace'] = trace
 
     return result
+
+
+def answer_question(
+    question: str,
+    top_k: int | None = None,
+    doc_ids: list[int] | None = None,
+    explain: bool = False,
+    mmr: bool | None = None,
+    mmr_lambda: float | None = None,
+    fetch_k: int | None = None,
+    collection: str | None = None,
+    max_distance: float | None = None,
+    max_prompt_tokens: int | None = None,
+    route_docs: int | None = None,
+) -> dict:
+    total_start = time.perf_counter()
+    trace = None
+    usage = usage_service.new_usage()
+    retrieve_options = {
+        'mmr': mmr,
+        'mmr_lambda': mmr_lambda,
+        'fetch_k': fetch_k,
+        'collection': collection,
+        'usage': usage,
+        'route_docs': route_docs,
+    }
+    if explain:
+        hits, trace = retrieve(question, top_k=top_k, doc_ids=doc_ids, with_trace=True, **retrieve_options)
+    else:
+        hits = retrieve(question, top_k=top_k, doc_ids=doc_ids, **retrieve_options)
+
+    return _answer_from_hits(
+        question,
+        hits,
+        trace,
+        total_start,
+        _max_distance(max_distance),
+        max_prompt_tokens,
+        usage,
+    )
+
+
+def answer_questions(
+    questions: list[str],
+    top_k: int | None = None,
+    doc_ids: list[int] | None = None,
+    explain: bool = False,
+    mmr: bool | None = None,
+    mmr_lambda: float | None = None,
+    fetch_k: int | None = None,
+    collection: str | None = None,
+    max_distance: float | None = None,
+    max_prompt_tokens: int | None = None,
+    route_docs: int | None = None,
+) -> list[dict]:
+    if not questions:
+        return []
+    total_start = time.perf_counter()
+    options = _retrieval_options(top_k, mmr, mmr_lambda, fetch_k, collection, route_docs)
+    max_distance = _max_distance(max_distance)
+    shared_steps = []
+
+    with replica_reads():
+        where = _document_filter(doc_ids, options, shared_steps)
+    per_question_candidates = [None] * len(questions)
+    if where is None:
+        embeddings = [None] * len(questions)
+        batch_results = [None] * len(questions)
+        item_usages = [usage_service.new_usage() for _ in questions]
+    else:
+        embed_start = time.perf_counter()
+        batch_usage = usage_service.new_usage()
+        with replica_reads():
+            embed_model = reembed.active_model()
+        embeddings = llm_client.embed_texts(questions, usage=batch_usage, model=embed_model)
+        embed_end = time.perf_counter()
+        # Each answer's usage carries its share of the batch call, so per-item traces add up to the batch.
+        item_usages = usage_service.split_embedding(batch_usage, questions)
+        shared_steps.append({
+            'name': 'Embed questions',
+            'ms': round((embed_end - embed_start) * 1000, 2),
+            'detail': (
+                f"model={embed_model} batch={len(questions)} "
+                f"tokens={batch_usage['embedding_tokens']}"
+            ),
+        })
+
+        if _routing_applies(where, options):
+            route_start = time.perf_counter()
+            with replica_reads():
+                per_question_candidates = [
+                    vector_store.query_documents(embedding, options['route_docs'], where=where)
+                    for embedding in embeddings
+                ]
+            route_end = time.perf_counter()
+            # One shared chunk scan keeps the batch to a single round trip, so it covers every question's candidates.
+            candidates = {pair for question_candidates in per_question_candidates for pair in question_candidates}
+            where = _routed_where(where, list(candidates))
+            shared_steps.append({
+                'name': 'Document routing',
+                'ms': round((route_end - route_start) * 1000, 2),
+                'detail': (
+                    f"top_n={options['route_docs']} batch={len(questions)} "
+                    f"candidates={len({doc_id for doc_id, _ in candidates})}"
+                    + ('' if candidates else ' fallback=all_chunks')
+                ),
+            })
+
+        query_start = time.perf_counter()
+        with replica_reads():
+            batch_results = vector_store.query_many(
+                embeddings,
+                _search_limit(options),
+                where=where,
+                include_embeddings=options['mmr'],
+            )
+        query_end = time.perf_counter()
+        deepest = max(batch_results, key=lambda results: results['search_passes'])
+        shared_steps.append({
+            'name': 'Vector search',
+            'ms': round((query_end - query_start) * 1000, 2),
+            'detail': f"{_search_detail(options, deepest)} batch={len(questions)}",
+        })
+
+    retrieved = []
+    for embedding, results, candidates in zip(embeddings, batch_results, per_question_candidates):
+        trace_steps = [dict(step) for step in shared_steps]
+        hits = _select_hits(embedding, results, options, trace_steps) if results is not None else []
+        trace = None
+        if explain:
+            trace = _retrieval_trace(options, hits, trace_steps, doc_ids if where is not None else [], candidates)
+        retrieved.append((hits, trace))
+
+    # Generation is I/O bound and touches no DB state, so it is safe to fan out to threads.
+    workers = max(1, min(settings.ASK_BATCH_CONCURRENCY, len(questions)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _answer_from_hits,
+                question,
+                hits,
+                trace,
+                total_start,
+                max_distance,
+                max_prompt_tokens,
+                item_usage,
+            )
+            for question, (hits, trace), item_usage in zip(questions, retrieved, item_usages)
+        ]
+    answers = []
+    for question, future in zip(questions, futures):
+        try:
+            result = future.result()
+        except PromptBudgetExceeded as exc:
+            result = {'answer': None, 'sources': [], 'gated': False, 'error': str(exc)}
+        except Exception as exc:
+            logger.exception('Batch answer failed')
+            result = {'answer': None, 'sources': [], 'gated': False, 'error': str(exc)}
+        answers.append({'question': question, **result})
+    return answers
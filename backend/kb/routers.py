@@ -0,0 +1,122 @@
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = 'replica_'
+_LAG_SQL = (
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_replica_reads = contextvars.ContextVar('kb_replica_reads', default=False)
+_round_robin = itertools.count()
+_status_lock = threading.Lock()
+_status = {}
+_probing = set()
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside the block to a replica whose lag is within REPLICA_MAX_LAG_SECONDS."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _probe(alias: str) -> dict:
+    start = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(_LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+        healthy = True
+    except DatabaseError:
+        logger.warning('Replica %s is unreachable', alias, exc_info=True)
+        lag = None
+        healthy = False
+    latency_ms = (time.perf_counter() - start) * 1000
+    previous = _status.get(alias)
+    if previous and previous.get('latency_ms') is not None and healthy:
+        # Smooth latency so one slow probe does not flip the preferred replica.
+        latency_ms = 0.7 * previous['latency_ms'] + 0.3 * latency_ms
+    return {
+        'alias': alias,
+        'healthy': healthy,
+        'lag_seconds': lag,
+        'latency_ms': round(latency_ms, 2) if healthy else None,
+        'checked_at': time.time(),
+    }
+
+
+def _pending(alias: str) -> dict:
+    # First probe still in flight: report the replica as unusable rather than wait for it.
+    return {'alias': alias, 'healthy': False, 'lag_seconds': None, 'latency_ms': None, 'checked_at': None}
+
+
+def replica_status(refresh: bool = False) -> list[dict]:
+    now = time.time()
+    statuses = []
+    for alias in replica_aliases():
+        with _status_lock:
+            status = _status.get(alias)
+            stale = refresh or status is None or now - status['checked_at'] >= settings.REPLICA_LAG_CHECK_INTERVAL
+            # Single-flight: one caller probes while the rest keep serving the last status.
+            probe = stale and alias not in _probing
+            if probe:
+                _probing.add(alias)
+        if probe:
+            try:
+                status = _probe(alias)
+                with _status_lock:
+                    _status[alias] = status
+            finally:
+                with _status_lock:
+                    _probing.discard(alias)
+        statuses.append(status or _pending(alias))
+    return statuses
+
+
+def choose_replica() -> str | None:
+    candidates = [
+        status for status in replica_status()
+        if status['healthy'] and status['lag_seconds'] <= settings.REPLICA_MAX_LAG_SECONDS
+    ]
+    if not candidates:
+        return None
+    if settings.REPLICA_SELECTION == 'least_latency':
+        return min(candidates, key=lambda status: status['latency_ms'])['alias']
+    return candidates[next(_round_robin) % len(candidates)]['alias']
+
+
+class ReplicaRouter:
+    """Send opted-in reads to replicas; everything else stays on the primary."""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not replica_aliases():
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return not db.startswith(REPLICA_PREFIX)
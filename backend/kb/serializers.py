@@ -11,6 +11,7 @@ class DocumentSerializer(serializers.ModelSerializer):
         fields = (
             'id',
             'title',
+            'collection',
             'file',
             'file_url',
             'original_filename',
@@ -19,6 +20,8 @@ class DocumentSerializer(serializers.ModelSerializer):
             'chunks_count',
             'last_indexed_at',
             'error_message',
+            'content_hash',
+            'duplicate_of',
         )
 
     def get_file_url(self, obj):
@@ -31,7 +34,7 @@ class DocumentSerializer(serializers.ModelSerializer):
 class DocumentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
-        fields = ('title', 'file')
+        fields = ('title', 'collection', 'file')
 
 
 class IndexJobSerializer(serializers.ModelSerializer):
@@ -45,4 +48,9 @@ class IndexJobSerializer(serializers.ModelSerializer):
             'finished_at',
             'error_message',
             'celery_task_id',
+            'chunks_total',
+            'chunks_embedded',
+            'chunks_written',
+            'embedding_tokens',
+            'cost_usd',
         )
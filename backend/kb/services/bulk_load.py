@@ -0,0 +1,134 @@
+import struct
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from ..models import Chunk
+from . import vector_store
+
+_SIGNATURE = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_TRAILER = struct.pack('>h', -1)
+_NULL = struct.pack('>i', -1)
+_PG_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+_COLUMNS = (
+    'document_id',
+    'collection',
+    'chunk_index',
+    'text',
+    'span_start',
+    'span_end',
+    'vector_id',
+    'embedding',
+    'embed_model',
+    'embedding_next',
+    'created_at',
+)
+FLUSH_BYTES = 4 * 1024 * 1024
+
+
+def _text(value: str | None) -> bytes:
+    if value is None:
+        return _NULL
+    encoded = value.encode('utf-8')
+    return struct.pack('>i', len(encoded)) + encoded
+
+
+def _int(value: int | None) -> bytes:
+    return _NULL if value is None else struct.pack('>ii', 4, value)
+
+
+def _vector(row: np.ndarray) -> bytes:
+    # pgvector binary format: int16 dims, int16 unused, then big-endian float4 values.
+    return struct.pack('>ihh', 4 + 4 * row.shape[0], row.shape[0], 0) + row.tobytes()
+
+
+def _optional_vector(value) -> bytes:
+    return _NULL if value is None else _vector(np.asarray(value, dtype='>f4'))
+
+
+def _embedding_rows(chunks, embeddings):
+    if embeddings is not None:
+        # One conversion to a contiguous big-endian float32 matrix; rows are then sliced as raw bytes.
+        matrix = np.ascontiguousarray(embeddings, dtype='>f4')
+        return (_vector(row) for row in matrix)
+    return (_optional_vector(chunk.embedding) for chunk in chunks)
+
+
+def load_chunks(chunks: list[Chunk], embeddings=None, batch_size: int = 1000, using: str | None = None) -> int:
+    """Insert unsaved chunks, streaming them with binary COPY on Postgres.
+
+    ``embeddings`` is an optional ``rows x dims`` array aligned with ``chunks``; when omitted
+    each chunk's own ``embedding`` is used. ``using`` names the shard that owns the chunks.
+    Inserted chunks do not get their primary keys back.
+    """
+    if not chunks:
+        return 0
+    using = using or router.db_for_write(Chunk)
+    if not vector_store.uses_pgvector():
+        if embeddings is not None:
+            for chunk, embedding in zip(chunks, embeddings):
+                chunk.embedding = embedding
+        Chunk.objects.using(using).bulk_create(chunks, batch_size=batch_size)
+        return len(chunks)
+
+    created_at = timezone.now()
+    created_field = struct.pack('>iq', 8, (created_at - _PG_EPOCH) // timedelta(microseconds=1))
+    sql = f"COPY {Chunk._meta.db_table} ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT BINARY)"
+    buffer = bytearray(_SIGNATURE)
+    with connections[using].cursor() as cursor:
+        with cursor.copy(sql) as copy:
+            for chunk, vector in zip(chunks, _embedding_rows(chunks, embeddings)):
+                chunk.created_at = created_at
+                buffer += struct.pack('>hiq', len(_COLUMNS), 8, chunk.document_id)
+                buffer += _text(chunk.collection)
+                buffer += _int(chunk.chunk_index)
+                buffer += _text(chunk.text)
+                buffer += _int(chunk.span_start)
+                buffer += _int(chunk.span_end)
+                buffer += _text(chunk.vector_id)
+                buffer += vector
+                buffer += _text(chunk.embed_model)
+                buffer += _optional_vector(chunk.embedding_next)
+                buffer += created_field
+                if len(buffer) >= FLUSH_BYTES:
+                    copy.write(bytes(buffer))
+                    buffer.clear()
+            buffer += _TRAILER
+            copy.write(bytes(buffer))
+    return len(chunks)
+
+
+def update_next_embeddings(chunks: list[Chunk], embeddings, using: str | None = None) -> int:
+    """Set ``embedding_next`` on saved chunks: binary COPY into a staging table, then one UPDATE ... FROM.
+
+    ``embeddings`` is a ``rows x dims`` array aligned with ``chunks``. Off Postgres this falls back
+    to ``bulk_update``.
+    """
+    if not chunks:
+        return 0
+    using = using or router.db_for_write(Chunk)
+    if not vector_store.uses_pgvector():
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk.embedding_next = embedding
+        return Chunk.objects.using(using).bulk_update(chunks, ['embedding_next'])
+
+    table = Chunk._meta.db_table
+    buffer = bytearray(_SIGNATURE)
+    for chunk, vector in zip(chunks, _embedding_rows(chunks, embeddings)):
+        buffer += struct.pack('>hiq', 2, 8, chunk.pk)
+        buffer += vector
+    buffer += _TRAILER
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {table}_next_stage (id bigint PRIMARY KEY, embedding_next vector) ON COMMIT DROP"
+            )
+            with cursor.copy(f"COPY {table}_next_stage (id, embedding_next) FROM STDIN WITH (FORMAT BINARY)") as copy:
+                copy.write(bytes(buffer))
+            cursor.execute(
+                f"UPDATE {table} SET embedding_next = stage.embedding_next "
+                f"FROM {table}_next_stage stage WHERE {table}.id = stage.id"
+            )
+            return cursor.rowcount
@@ -1,7 +1,8 @@
-﻿from typing import List
+﻿from typing import List, Tuple
 
 
-def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+def chunk_spans(text: str, chunk_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` offsets of each whitespace-trimmed chunk of ``text``."""
     if not text:
         return []
     if chunk_size <= 0:
@@ -9,13 +10,19 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     if overlap >= chunk_size:
         raise ValueError('overlap must be smaller than chunk_size')
 
-    chunks = []
+    spans = []
     start = 0
     length = len(text)
     while start < length:
         end = min(start + chunk_size, length)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+        window = text[start:end]
+        stripped = window.lstrip()
+        if stripped:
+            chunk_start = start + len(window) - len(stripped)
+            spans.append((chunk_start, chunk_start + len(stripped.rstrip())))
         start += chunk_size - overlap
-    return chunks
+    return spans
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap)]
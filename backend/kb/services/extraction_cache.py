@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+
+from django.conf import settings
+
+from . import parsers
+
+logger = logging.getLogger(__name__)
+
+# Plain text reads as fast as a cache hit would.
+CACHED_EXTENSIONS = {'.pdf'}
+COMPRESSION_LEVEL = 6
+# Eviction trims below the cap so back-to-back inserts do not each rescan the directory.
+EVICT_TO_FRACTION = 0.9
+
+
+def enabled() -> bool:
+    return settings.EXTRACTION_CACHE_MAX_BYTES > 0
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(settings.UPLOAD_STREAM_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_path(content_hash: str, ext: str) -> str:
+    name = f"{content_hash}-{parsers.parser_version(ext)}.txt.z"
+    return os.path.join(settings.EXTRACTION_CACHE_DIR, content_hash[:2], name)
+
+
+def get(content_hash: str, ext: str) -> str | None:
+    path = _entry_path(content_hash, ext)
+    try:
+        with open(path, 'rb') as handle:
+            blob = handle.read()
+        # mtime is the LRU clock; a hit makes the entry the most recently used.
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    try:
+        return zlib.decompress(blob).decode('utf-8')
+    except zlib.error:
+        logger.warning('Discarding corrupt extraction cache entry %s', path)
+        _remove(path)
+        return None
+
+
+def put(content_hash: str, ext: str, text: str) -> None:
+    path = _entry_path(content_hash, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside and renamed so concurrent workers never read a partial entry.
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as handle:
+        handle.write(zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL))
+    os.replace(handle.name, path)
+    evict()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _entries():
+    root = settings.EXTRACTION_CACHE_DIR
+    if not os.path.isdir(root):
+        return
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if entry.name.endswith('.txt.z'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+
+def stats() -> dict:
+    entries = list(_entries())
+    return {
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': settings.EXTRACTION_CACHE_MAX_BYTES,
+    }
+
+
+def evict() -> int:
+    """Drop least recently used entries until the cache fits under EXTRACTION_CACHE_MAX_BYTES."""
+    entries = list(_entries())
+    total = sum(size for _, size, _ in entries)
+    if total <= settings.EXTRACTION_CACHE_MAX_BYTES:
+        return 0
+    target = settings.EXTRACTION_CACHE_MAX_BYTES * EVICT_TO_FRACTION
+    removed = 0
+    for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+        if total <= target:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def load_text(file_path: str, content_hash: str | None = None) -> str:
+    """``parsers.load_text`` that reuses earlier extractions of the same file content."""
+    ext = parsers.ensure_supported(file_path)
+    if not enabled() or ext not in CACHED_EXTENSIONS:
+        return parsers.load_text(file_path)
+    content_hash = content_hash or file_hash(file_path)
+    text = get(content_hash, ext)
+    if text is not None:
+        logger.info('Extraction cache hit for %s', file_path)
+        return text
+    text = parsers.load_text(file_path)
+    try:
+        put(content_hash, ext, text)
+    except OSError:
+        logger.warning('Failed to write extraction cache entry for %s', file_path, exc_info=True)
+    return text
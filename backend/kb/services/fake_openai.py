@@ -0,0 +1,164 @@
+import base64
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Words hash into this many fixed random directions, so texts sharing words get nearby embeddings.
+_VOCAB_ROWS = 4096
+
+
+class FakeOpenAI:
+    """Local stand-in for the OpenAI embeddings and chat endpoints, with injected latency and errors."""
+
+    def __init__(
+        self,
+        dims: int = 1536,
+        embed_latency_ms: float = 50.0,
+        chat_latency_ms: float = 800.0,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        answer_words: int = 60,
+        seed: int = 0,
+    ):
+        self.dims = dims
+        self.embed_latency_ms = embed_latency_ms
+        self.chat_latency_ms = chat_latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.answer_words = answer_words
+        self.table = np.random.default_rng(seed).standard_normal((_VOCAB_ROWS, dims), dtype=np.float32)
+        self.stats = {'embeddings': 0, 'chat': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = None
+
+    def embed(self, text: str) -> np.ndarray:
+        words = text.lower().split() or ['']
+        rows = [zlib.crc32(word.encode('utf-8')) % _VOCAB_ROWS for word in words]
+        vector = self.table[rows].sum(axis=0)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _delay(self, mean_ms: float) -> None:
+        if mean_ms > 0:
+            with self._lock:
+                factor = self._random.uniform(1 - self.jitter, 1 + self.jitter)
+            time.sleep(mean_ms * factor / 1000)
+
+    def _fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def embeddings(self, body: dict) -> dict:
+        texts = body.get('input') or []
+        if isinstance(texts, str):
+            texts = [texts]
+        # Per-item latency is small next to the round trip, so one delay covers the batch.
+        self._delay(self.embed_latency_ms)
+        as_base64 = body.get('encoding_format') == 'base64'
+        data = []
+        for index, text in enumerate(texts):
+            vector = self.embed(str(text))
+            embedding = (
+                base64.b64encode(vector.astype('<f4').tobytes()).decode('ascii') if as_base64 else vector.tolist()
+            )
+            data.append({'object': 'embedding', 'index': index, 'embedding': embedding})
+        tokens = sum(len(str(text)) // 4 + 1 for text in texts)
+        self._count('embeddings')
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', ''),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        }
+
+    def chat(self, body: dict) -> dict:
+        self._delay(self.chat_latency_ms)
+        prompt = ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+        prompt_tokens = len(prompt) // 4 + 1
+        content = ' '.join(['Synthetic answer'] + ['lorem'] * max(self.answer_words - 2, 0)) + ' [1]'
+        self._count('chat')
+        return {
+            'id': f"chatcmpl-fake-{time.time_ns()}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', ''),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': self.answer_words,
+                'total_tokens': prompt_tokens + self.answer_words,
+            },
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._send(200, {'object': 'list', 'data': []})
+                else:
+                    self._send(404, {'error': {'message': 'not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send(400, {'error': {'message': 'invalid JSON'}})
+                    return
+                if self.path.endswith('/embeddings'):
+                    route = fake.embeddings
+                elif self.path.endswith('/chat/completions'):
+                    route = fake.chat
+                else:
+                    self._send(404, {'error': {'message': 'not found'}})
+                    return
+                if fake._fails():
+                    fake._count('errors')
+                    self._send(fake.error_status, {'error': {'message': 'injected failure', 'type': 'fake'}})
+                    return
+                self._send(200, route(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Serve on a background thread; returns the base URL to use as OPENAI_BASE_URL."""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-openai', daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/v1"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -1,22 +1,45 @@
-﻿from openai import OpenAI
+﻿import threading
+
 from django.conf import settings
 
+from . import usage as usage_service
+
+_client = None
+_client_lock = threading.Lock()
+
 
-_client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
 
+                _client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+    return _client
 
-def embed_texts(texts: list[str]) -> list[list[float]]:
+
+def embed_texts(texts: list[str], usage: dict | None = None, model: str | None = None) -> list[list[float]]:
     if not texts:
         return []
-    response = _client.embeddings.create(
-        model=settings.EMBED_MODEL,
+    if model is None:
+        from .reembed import active_model
+
+        model = active_model()
+    response = get_client().embeddings.create(
+        model=model,
         input=texts,
     )
+    if response.usage is not None:
+        prompt_tokens = response.usage.prompt_tokens
+    else:
+        prompt_tokens = sum(usage_service.estimate_tokens(text) for text in texts)
+    usage_service.record('embedding', prompt_tokens, usage=usage)
     return [item.embedding for item in response.data]
 
 
-def chat_complete(system: str, user: str) -> str:
-    response = _client.chat.completions.create(
+def chat_complete(system: str, user: str, usage: dict | None = None) -> str:
+    response = get_client().chat.completions.create(
         model=settings.CHAT_MODEL,
         messages=[
             {'role': 'system', 'content': system},
@@ -24,4 +47,11 @@ def chat_complete(system: str, user: str) -> str:
         ],
         temperature=0,
     )
+    if response.usage is not None:
+        prompt_tokens = response.usage.prompt_tokens
+        completion_tokens = response.usage.completion_tokens
+    else:
+        prompt_tokens = usage_service.estimate_tokens(system) + usage_service.estimate_tokens(user)
+        completion_tokens = 0
+    usage_service.record('chat', prompt_tokens, completion_tokens, usage=usage)
     return response.choices[0].message.content.strip()
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+# Each synthetic document leans on one topic, so questions about a topic have relevant chunks to find.
+TOPICS = {
+    'billing': 'invoice refund payment charge subscription receipt tax discount currency ledger',
+    'security': 'password token encryption audit breach firewall certificate access role policy',
+    'shipping': 'parcel courier warehouse tracking delivery customs pallet freight route carrier',
+    'hiring': 'candidate interview offer onboarding salary recruiter resume referral contract probation',
+    'outages': 'incident latency failover pager rollback alert dashboard uptime capacity postmortem',
+}
+FILLER = (
+    'the a of to and in for on with as by at from that this is are was be has have will can should may '
+    'team process customer system report policy request update change review support service data'
+).split()
+_JOB_DONE = {'DONE', 'FAILED'}
+
+
+class Corpus:
+    """Deterministic synthetic documents and questions."""
+
+    def __init__(self, seed: int = 0, words_per_doc: int = 800):
+        self.words_per_doc = words_per_doc
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._topics = {name: words.split() for name, words in TOPICS.items()}
+
+    def document(self) -> tuple[str, str]:
+        with self._lock:
+            topic = self._random.choice(list(self._topics))
+            words = [
+                self._random.choice(self._topics[topic]) if self._random.random() < 0.3 else self._random.choice(FILLER)
+                for _ in range(self.words_per_doc)
+            ]
+        # A unique marker keeps upload dedupe from collapsing the corpus into one document.
+        marker = uuid.uuid4().hex
+        sentences = [' '.join(words[start:start + 12]).capitalize() + '.' for start in range(0, len(words), 12)]
+        return f"loadtest {topic} {marker[:8]}", f"{topic} {marker}\n\n" + ' '.join(sentences)
+
+    def question(self) -> str:
+        with self._lock:
+            topic = self._random.choice(list(self._topics))
+            terms = self._random.sample(self._topics[topic], 3)
+        return f"What does the {topic} guide say about {terms[0]}, {terms[1]} and {terms[2]}?"
+
+
+class ApiClient:
+    """Thin thread-safe client for the endpoints the load test drives."""
+
+    def __init__(self, base_url: str, token: str, concurrency: int, timeout: float):
+        self.http = httpx.Client(
+            base_url=base_url.rstrip('/') + '/api/',
+            headers={'Authorization': f"Token {token}"},
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def obtain_token(base_url: str, username: str, password: str, timeout: float = 30.0) -> str:
+        response = httpx.post(
+            base_url.rstrip('/') + '/api/token/',
+            data={'username': username, 'password': password},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()['token']
+
+    def ask(self, question: str, collection: str) -> httpx.Response:
+        return self.http.post('ask/', json={'question': question, 'collection': collection, 'sources': 'ids'})
+
+    def upload(self, title: str, text: str, collection: str) -> httpx.Response:
+        return self.http.post(
+            'docs/',
+            data={'title': title, 'collection': collection},
+            files={'file': (f"{title.replace(' ', '-')}.txt", text.encode('utf-8'), 'text/plain')},
+        )
+
+    def index(self, doc_id: int) -> httpx.Response:
+        return self.http.post(f"docs/{doc_id}/index/", json={})
+
+    def job_status(self, job_id: str) -> str | None:
+        response = self.http.get(f"jobs/{job_id}/")
+        # 404 until a worker picks the task up and creates the job row.
+        return response.json().get('status') if response.status_code == 200 else None
+
+    def close(self) -> None:
+        self.http.close()
+
+
+def upload_and_index(client: ApiClient, corpus: Corpus, collection: str) -> tuple[httpx.Response, str | None]:
+    title, text = corpus.document()
+    response = client.upload(title, text, collection)
+    if response.status_code != 201:
+        return response, None
+    response = client.index(response.json()['id'])
+    return response, response.json().get('job_id') if response.status_code == 200 else None
+
+
+def wait_for_jobs(client: ApiClient, job_ids: list[str], timeout: float, poll_s: float = 0.5) -> dict:
+    """Poll index jobs until all finish or ``timeout`` passes."""
+    start = time.perf_counter()
+    pending = set(job_ids)
+    statuses = Counter()
+    while pending and time.perf_counter() - start < timeout:
+        for job_id in list(pending):
+            status = client.job_status(job_id)
+            if status in _JOB_DONE:
+                statuses[status] += 1
+                pending.discard(job_id)
+        if pending:
+            time.sleep(poll_s)
+    elapsed = time.perf_counter() - start
+    done = statuses['DONE']
+    return {
+        'jobs': len(job_ids),
+        'done': done,
+        'failed': statuses['FAILED'],
+        'timed_out': len(pending),
+        'drain_s': round(elapsed, 2),
+        'indexed_per_s': round(done / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def seed(client: ApiClient, corpus: Corpus, collection: str, docs: int, concurrency: int, timeout: float) -> dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        uploads = list(pool.map(lambda _: upload_and_index(client, corpus, collection), range(docs)))
+    job_ids = [job_id for _, job_id in uploads if job_id]
+    result = wait_for_jobs(client, job_ids, timeout)
+    result['rejected'] = docs - len(job_ids)
+    result['total_s'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def _outcome(call) -> tuple[int | str, str | None]:
+    try:
+        result = call()
+    except httpx.HTTPError as exc:
+        return type(exc).__name__, None
+    response, job_id = result if isinstance(result, tuple) else (result, None)
+    return response.status_code, job_id
+
+
+def run_step(call, rps: float, duration: float, concurrency: int) -> dict:
+    """Fire ``call`` open-loop at ``rps`` for ``duration`` seconds.
+
+    Latency is measured from each request's scheduled start, so time spent queued behind a
+    saturated backend (or an exhausted ``concurrency``) counts against it.
+    """
+    total = max(int(rps * duration), 1)
+    outcomes = []
+    start = time.perf_counter()
+
+    def fire(scheduled: float) -> None:
+        status, job_id = _outcome(call)
+        outcomes.append((time.perf_counter() - scheduled, status, job_id))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for number in range(total):
+            scheduled = start + number / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, scheduled)
+    elapsed = time.perf_counter() - start
+    return summarize(rps, outcomes, elapsed)
+
+
+def summarize(rps: float, outcomes: list, elapsed: float) -> dict:
+    statuses = Counter(str(status) for _, status, _ in outcomes)
+    ok = [latency for latency, status, _ in outcomes if isinstance(status, int) and 200 <= status < 300]
+    latencies = np.array(ok) * 1000 if ok else np.zeros(1)
+    percentiles = np.percentile(latencies, [50, 90, 95, 99])
+    return {
+        'target_rps': rps,
+        'requests': len(outcomes),
+        'ok': len(ok),
+        'throughput': round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(1 - len(ok) / len(outcomes), 4) if outcomes else 0.0,
+        'statuses': dict(statuses),
+        'p50_ms': round(float(percentiles[0]), 1),
+        'p90_ms': round(float(percentiles[1]), 1),
+        'p95_ms': round(float(percentiles[2]), 1),
+        'p99_ms': round(float(percentiles[3]), 1),
+        'max_ms': round(float(latencies.max()), 1),
+        'elapsed_s': round(elapsed, 2),
+        'job_ids': [job_id for _, _, job_id in outcomes if job_id],
+    }
+
+
+def saturation_reasons(step: dict, p95_slo_ms: float | None, max_error_rate: float, min_throughput: float) -> list:
+    reasons = []
+    if step['throughput'] < step['target_rps'] * min_throughput:
+        reasons.append(f"throughput {step['throughput']}/s below {min_throughput:.0%} of target")
+    if step['error_rate'] > max_error_rate:
+        reasons.append(f"error rate {step['error_rate']:.2%}")
+    if p95_slo_ms and step['p95_ms'] > p95_slo_ms:
+        reasons.append(f"p95 {step['p95_ms']}ms over {p95_slo_ms}ms")
+    return reasons
@@ -0,0 +1,191 @@
+import logging
+import time
+from datetime import datetime, time as dt_time
+
+import redis
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from ..models import Chunk, EmbeddingMigration, IndexJob
+from . import shards
+
+logger = logging.getLogger(__name__)
+
+_client = None
+LOCK_KEY = 'kb:maintenance:lock'
+# Index bytes per live row measured right after a rebuild (or first sighting); growth past it is bloat.
+BASELINE_KEY = 'kb:maintenance:index_baseline'
+
+_TABLE_SQL = (
+    "SELECT n_live_tup, n_dead_tup, pg_relation_size(relid), GREATEST(last_vacuum, last_autovacuum) "
+    "FROM pg_stat_user_tables WHERE relname = %s"
+)
+_INDEXES_SQL = (
+    "SELECT i.indexrelname, pg_relation_size(i.indexrelid) FROM pg_stat_user_indexes i "
+    "JOIN pg_indexes p ON p.indexname = i.indexrelname AND p.tablename = i.relname "
+    "WHERE i.relname = %s AND p.indexdef ILIKE '%%USING hnsw%%'"
+)
+_ACTIVE_SQL = (
+    "SELECT count(*) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND state = 'active' AND pid <> pg_backend_pid()"
+)
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def _baseline_field(alias: str, index: str) -> str:
+    return f"{alias}:{index}"
+
+
+def chunk_table_stats(alias: str) -> dict | None:
+    """Dead tuples and HNSW index size per live row for ``kb_chunk`` on one PostgreSQL database."""
+    table = Chunk._meta.db_table
+    with connections[alias].cursor() as cursor:
+        cursor.execute(_TABLE_SQL, [table])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        live, dead, table_bytes, last_vacuum = row
+        cursor.execute(_INDEXES_SQL, [table])
+        index_rows = cursor.fetchall()
+
+    baselines = _redis().hgetall(BASELINE_KEY)
+    indexes = []
+    for name, size in index_rows:
+        per_row = size / live if live else None
+        baseline = baselines.get(_baseline_field(alias, name).encode())
+        if baseline is None and per_row:
+            _redis().hset(BASELINE_KEY, _baseline_field(alias, name), per_row)
+            baseline = per_row
+        indexes.append({
+            'name': name,
+            'bytes': size,
+            'bytes_per_row': round(per_row, 1) if per_row else None,
+            'bloat': round(per_row / float(baseline), 2) if per_row and baseline else None,
+        })
+    return {
+        'alias': alias,
+        'table': table,
+        'live_tuples': live,
+        'dead_tuples': dead,
+        'dead_ratio': round(dead / (live + dead), 4) if live + dead else 0.0,
+        'table_bytes': table_bytes,
+        'last_vacuum': last_vacuum,
+        'indexes': indexes,
+    }
+
+
+def plan(stats: dict) -> list[dict]:
+    actions = []
+    dead_enough = stats['dead_tuples'] >= settings.MAINTENANCE_MIN_DEAD_TUPLES
+    if dead_enough and stats['dead_ratio'] >= settings.MAINTENANCE_DEAD_RATIO:
+        actions.append({
+            'action': 'vacuum',
+            'target': stats['table'],
+            'reason': f"dead_tuples={stats['dead_tuples']} dead_ratio={stats['dead_ratio']}",
+        })
+    for index in stats['indexes']:
+        if index['bloat'] is not None and index['bloat'] >= settings.MAINTENANCE_INDEX_BLOAT:
+            actions.append({
+                'action': 'reindex',
+                'target': index['name'],
+                'reason': f"bloat={index['bloat']}x bytes={index['bytes']}",
+            })
+    return actions
+
+
+def in_window(now: datetime | None = None) -> bool:
+    """Whether local time falls inside MAINTENANCE_WINDOW ("HH:MM-HH:MM", may wrap midnight; empty is always)."""
+    if not settings.MAINTENANCE_WINDOW:
+        return True
+    start, end = (dt_time.fromisoformat(part.strip()) for part in settings.MAINTENANCE_WINDOW.split('-'))
+    current = (now or timezone.localtime()).time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+def quiet_reason(alias: str) -> str | None:
+    """Why maintenance should wait on ``alias`` right now, or None when it is quiet."""
+    if not in_window():
+        return f"outside maintenance window {settings.MAINTENANCE_WINDOW}"
+    if IndexJob.objects.filter(status=IndexJob.Status.RUNNING).exists():
+        return 'index jobs running'
+    if EmbeddingMigration.objects.filter(status=EmbeddingMigration.Status.RUNNING).exists():
+        return 'embedding migration running'
+    with connections[alias].cursor() as cursor:
+        cursor.execute(_ACTIVE_SQL)
+        active = cursor.fetchone()[0]
+    if active > settings.MAINTENANCE_MAX_ACTIVE_QUERIES:
+        return f"{active} active queries"
+    return None
+
+
+def _execute(alias: str, action: dict) -> float:
+    start = time.perf_counter()
+    # VACUUM and REINDEX CONCURRENTLY refuse to run inside a transaction block; Django autocommits here.
+    with connections[alias].cursor() as cursor:
+        if action['action'] == 'vacuum':
+            cursor.execute(f"VACUUM (ANALYZE) {action['target']}")
+        else:
+            if settings.MAINTENANCE_WORK_MEM:
+                cursor.execute(
+                    'SELECT set_config(%s, %s, false)',
+                    ['maintenance_work_mem', settings.MAINTENANCE_WORK_MEM],
+                )
+            cursor.execute(f'REINDEX INDEX CONCURRENTLY "{action["target"]}"')
+    return time.perf_counter() - start
+
+
+def run(force: bool = False, dry_run: bool = False) -> list[dict]:
+    """Check every chunk database and vacuum or rebuild what crossed the thresholds, when it is quiet."""
+    aliases = [alias for alias in shards.write_aliases() if connections[alias].vendor == 'postgresql']
+    if not aliases:
+        return []
+    if not dry_run and not _redis().set(LOCK_KEY, 1, nx=True, ex=settings.MAINTENANCE_LOCK_TTL):
+        logger.info('Chunk maintenance already running elsewhere; skipping')
+        return []
+    report = []
+    try:
+        for alias in aliases:
+            stats = chunk_table_stats(alias)
+            if stats is None:
+                continue
+            entry = {'stats': stats, 'actions': plan(stats), 'skipped': None}
+            report.append(entry)
+            if not entry['actions'] or dry_run:
+                continue
+            entry['skipped'] = None if force else quiet_reason(alias)
+            if entry['skipped']:
+                logger.info('Deferring chunk maintenance on %s: %s', alias, entry['skipped'])
+                continue
+            for action in entry['actions']:
+                try:
+                    action['seconds'] = round(_execute(alias, action), 2)
+                except DatabaseError as exc:
+                    # A failed concurrent rebuild leaves an invalid *_ccnew index behind for an operator to drop.
+                    logger.exception('Chunk maintenance %s on %s failed', action['action'], alias)
+                    action['error'] = str(exc)
+                    continue
+                logger.info(
+                    'Chunk maintenance on %s: %s %s (%s)', alias, action['action'], action['target'], action['reason'],
+                )
+                if action['action'] == 'reindex':
+                    _redis().hdel(BASELINE_KEY, _baseline_field(alias, action['target']))
+            if any(action['action'] == 'reindex' and 'error' not in action for action in entry['actions']):
+                # Re-measure so the rebuilt size becomes the new baseline.
+                entry['after'] = chunk_table_stats(alias)
+    finally:
+        if not dry_run:
+            _redis().delete(LOCK_KEY)
+    return report
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(query_embedding, candidate_embeddings, top_k: int, lambda_mult: float = 0.5) -> list[int]:
+    """Return candidate indexes picked by maximal marginal relevance, best first."""
+    if top_k <= 0 or len(candidate_embeddings) == 0:
+        return []
+
+    candidates = _normalize(np.asarray(candidate_embeddings, dtype=np.float32))
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    count = candidates.shape[0]
+    top_k = min(top_k, count)
+
+    query_sim = candidates @ query
+    pair_sim = candidates @ candidates.T
+
+    selected = [int(np.argmax(query_sim))]
+    # Highest similarity of every candidate to anything already selected.
+    redundancy = pair_sim[selected[0]].copy()
+    available = np.ones(count, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < top_k:
+        scores = lambda_mult * query_sim - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pair_sim[best], out=redundancy)
+
+    return selected
@@ -1,42 +1,51 @@
 ﻿import os
+from functools import lru_cache
+from importlib import metadata
 
-from pypdf import PdfReader
+SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.md'}
+TEXT_READ_SIZE = 1024 * 1024
+# Bump whenever extraction output changes; cached text is keyed by it.
+PARSER_VERSION = 1
 
 
 def _ext_from_name(name: str) -> str:
     return os.path.splitext(name)[1].lower()
 
 
-def load_text(file_path: str) -> str:
-    ext = _ext_from_name(file_path)
-    if ext == '.pdf':
-        reader = PdfReader(file_path)
-        pages_text = []
-        for page in reader.pages:
-            pages_text.append(page.extract_text() or '')
-        return '\n'.join(pages_text)
+def ensure_supported(filename: str) -> str:
+    ext = _ext_from_name(filename)
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return ext
 
-    if ext in {'.txt', '.md'}:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as handle:
-            return handle.read()
 
-    raise ValueError(f"Unsupported file type: {ext}")
+@lru_cache(maxsize=None)
+def parser_version(ext: str) -> str:
+    if ext == '.pdf':
+        # pypdf upgrades can change extracted text, so they invalidate cached PDFs too.
+        return f"{PARSER_VERSION}-pypdf{metadata.version('pypdf')}"
+    return str(PARSER_VERSION)
 
 
-def load_text_from_file(file_obj, filename: str) -> str:
-    ext = _ext_from_name(filename)
-    file_obj.seek(0)
+def iter_text(file_path: str):
+    ext = ensure_supported(file_path)
     if ext == '.pdf':
-        reader = PdfReader(file_obj)
-        pages_text = []
-        for page in reader.pages:
-            pages_text.append(page.extract_text() or '')
-        return '\n'.join(pages_text)
-
-    if ext in {'.txt', '.md'}:
-        data = file_obj.read()
-        if isinstance(data, bytes):
-            return data.decode('utf-8', errors='ignore')
-        return str(data)
-
-    raise ValueError(f"Unsupported file type: {ext}")
+        from pypdf import PdfReader
+
+        reader = PdfReader(file_path)
+        for page_number, page in enumerate(reader.pages):
+            if page_number:
+                yield '\n'
+            yield page.extract_text() or ''
+        return
+
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as handle:
+        while True:
+            block = handle.read(TEXT_READ_SIZE)
+            if not block:
+                return
+            yield block
+
+
+def load_text(file_path: str) -> str:
+    return ''.join(iter_text(file_path))
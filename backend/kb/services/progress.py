@@ -0,0 +1,83 @@
+import json
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {'DONE', 'FAILED'}
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def _channel(task_id: str) -> str:
+    return f"kb:index-progress:{task_id}"
+
+
+def _snapshot_key(task_id: str) -> str:
+    return f"kb:index-progress:{task_id}:latest"
+
+
+def publish(task_id: str | None, payload: dict) -> None:
+    """Push a progress event; failures are logged and never break indexing."""
+    if not task_id:
+        return
+    message = json.dumps(payload, default=str)
+    try:
+        client = _redis()
+        pipe = client.pipeline()
+        pipe.set(_snapshot_key(task_id), message, ex=settings.INDEX_PROGRESS_TTL)
+        pipe.publish(_channel(task_id), message)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning('Failed to publish index progress for %s', task_id, exc_info=True)
+
+
+def latest(task_id: str) -> dict | None:
+    try:
+        message = _redis().get(_snapshot_key(task_id))
+    except redis.RedisError:
+        return None
+    return json.loads(message) if message else None
+
+
+def listen(task_id: str, timeout: float, heartbeat: float = 15.0):
+    """Yield progress payloads for a task, or None when a heartbeat is due."""
+    pubsub = _redis().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(_channel(task_id))
+    try:
+        # Read the snapshot after subscribing so no event falls in between.
+        snapshot = latest(task_id)
+        if snapshot is not None:
+            yield snapshot
+            if snapshot.get('status') in TERMINAL_STATUSES:
+                return
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            message = pubsub.get_message(timeout=min(heartbeat, remaining))
+            if message is None:
+                yield None
+                continue
+            payload = json.loads(message['data'])
+            yield payload
+            if payload.get('status') in TERMINAL_STATUSES:
+                return
+    finally:
+        pubsub.close()
@@ -0,0 +1,117 @@
+import logging
+import math
+import os
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.CELERY_BROKER_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def _source_path(document) -> str | None:
+    if document.spool_path:
+        return document.spool_path
+    if document.file:
+        try:
+            return document.file.path
+        except NotImplementedError:
+            return None
+    return None
+
+
+def _page_count(path: str) -> int | None:
+    from pypdf import PdfReader
+
+    try:
+        return len(PdfReader(path).pages)
+    except Exception:
+        logger.warning('Could not count pages in %s', path, exc_info=True)
+        return None
+
+
+def estimate_cost(document) -> dict:
+    """Size the indexing work for a document from its source, without parsing the text."""
+    if document.duplicate_of_id:
+        canonical = document.duplicate_of
+        if canonical.status != canonical.Status.INDEXED:
+            # The task indexes the canonical document first, so size it by that source.
+            return estimate_cost(canonical)
+        # Duplicates copy the canonical document's chunks; nothing is parsed or embedded.
+        return {'bytes': 0, 'pages': None}
+    path = _source_path(document)
+    if path and os.path.exists(path):
+        size = os.path.getsize(path)
+        pages = None
+        if path.lower().endswith('.pdf') and size < settings.INDEX_LARGE_BYTES:
+            # Scanned or text-dense PDFs can be small on disk but still take minutes to parse.
+            pages = _page_count(path)
+        return {'bytes': size, 'pages': pages}
+    if document.file:
+        return {'bytes': document.file.size, 'pages': None}
+    if document.source_compressed:
+        return {'bytes': len(document.source_compressed), 'pages': None}
+    return {'bytes': len((document.raw_text or '').encode('utf-8')), 'pages': None}
+
+
+def route_for(document, bulk: bool = False) -> dict:
+    """Return ``apply_async`` options placing an index task on the queue that matches its cost."""
+    cost = estimate_cost(document)
+    large = cost['bytes'] >= settings.INDEX_LARGE_BYTES or (
+        cost['pages'] is not None and cost['pages'] >= settings.INDEX_LARGE_PAGES
+    )
+    return {
+        'queue': settings.INDEX_QUEUE_LARGE if large else settings.INDEX_QUEUE_SMALL,
+        'priority': settings.INDEX_PRIORITY_BULK if bulk else settings.INDEX_PRIORITY_INTERACTIVE,
+    }
+
+
+def _priority_key(queue: str, priority: int) -> str:
+    # Mirrors kombu's Redis layout: priority 0 uses the bare queue name.
+    if priority == 0:
+        return queue
+    return f"{queue}{settings.CELERY_BROKER_TRANSPORT_OPTIONS['sep']}{priority}"
+
+
+def queue_depths() -> dict:
+    queues = (settings.INDEX_QUEUE_SMALL, settings.INDEX_QUEUE_LARGE, settings.MAINTENANCE_QUEUE, settings.REEMBED_QUEUE)
+    steps = settings.CELERY_BROKER_TRANSPORT_OPTIONS['priority_steps']
+    pipe = _redis().pipeline()
+    for queue in queues:
+        for priority in steps:
+            pipe.llen(_priority_key(queue, priority))
+    lengths = iter(pipe.execute())
+    depths = {}
+    for queue in queues:
+        by_priority = {priority: next(lengths) for priority in steps}
+        depths[queue] = {
+            'depth': sum(by_priority.values()),
+            'by_priority': {priority: count for priority, count in by_priority.items() if count},
+        }
+    return depths
+
+
+def autoscale_hints() -> list[dict]:
+    """Suggest a worker count per index queue from its backlog, for an external autoscaler."""
+    hints = []
+    for queue, stats in queue_depths().items():
+        wanted = math.ceil(stats['depth'] / settings.INDEX_AUTOSCALE_TASKS_PER_WORKER)
+        hints.append({
+            'queue': queue,
+            'depth': stats['depth'],
+            'by_priority': stats['by_priority'],
+            'suggested_workers': max(settings.INDEX_AUTOSCALE_MIN_WORKERS, min(wanted, settings.INDEX_AUTOSCALE_MAX_WORKERS)),
+        })
+    return hints
@@ -0,0 +1,310 @@
+import logging
+import time
+from collections import deque
+from contextlib import ExitStack
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from ..models import Chunk, Document, EmbeddingMigration
+from . import bulk_load, llm_client, routing, shards, spans, usage as usage_service
+
+logger = logging.getLogger(__name__)
+
+# Migrations that still need new chunks written with both models.
+DUAL_WRITE_STATUSES = (
+    EmbeddingMigration.Status.PENDING,
+    EmbeddingMigration.Status.RUNNING,
+    EmbeddingMigration.Status.PAUSED,
+    EmbeddingMigration.Status.READY,
+)
+_STOP_STATUSES = (EmbeddingMigration.Status.PAUSED, EmbeddingMigration.Status.CANCELLED)
+_active = {'checked_at': float('-inf'), 'model': None}
+
+
+def active_model(fresh: bool = False) -> str:
+    """The model live vectors come from: the last switched migration's target, else EMBED_MODEL.
+
+    Cached for ``EMBED_MODEL_CACHE_TTL`` seconds so embedding questions does not cost a query each
+    time; writers pass ``fresh=True``. Always read from the primary, since a lagging replica could
+    still report the old model after a switch.
+    """
+    now = time.monotonic()
+    if fresh or now - _active['checked_at'] >= settings.EMBED_MODEL_CACHE_TTL:
+        switched = (
+            EmbeddingMigration.objects.using(shards.PRIMARY)
+            .filter(status=EmbeddingMigration.Status.SWITCHED)
+            .order_by('-switched_at')
+            .values_list('target_model', flat=True)
+            .first()
+        )
+        _active['model'] = switched or settings.EMBED_MODEL
+        _active['checked_at'] = now
+    return _active['model']
+
+
+def dual_write_migration() -> EmbeddingMigration | None:
+    return EmbeddingMigration.objects.filter(status__in=DUAL_WRITE_STATUSES).order_by('-id').first()
+
+
+def start(target_model: str) -> EmbeddingMigration:
+    source_model = active_model(fresh=True)
+    if target_model == source_model:
+        raise ValueError(f"{target_model} is already the live embedding model.")
+    if dual_write_migration() is not None:
+        raise ValueError('Another embedding migration is in progress; switch or cancel it first.')
+    return EmbeddingMigration.objects.create(
+        source_model=source_model,
+        target_model=target_model,
+        chunks_total=sum(
+            Chunk.objects.using(alias).exclude(embedding__isnull=True).count() for alias in shards.write_aliases()
+        ),
+    )
+
+
+class Throttle:
+    """Rolling one-minute budget for provider calls, in requests and (estimated) tokens."""
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.calls = deque()
+
+    def wait(self, tokens: int) -> float:
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0][0] >= 60:
+                self.calls.popleft()
+            used = sum(spent for _, spent in self.calls)
+            within_tokens = not self.tokens_per_minute or not self.calls or used + tokens <= self.tokens_per_minute
+            within_requests = not self.requests_per_minute or len(self.calls) < self.requests_per_minute
+            if within_tokens and within_requests:
+                self.calls.append((now, tokens))
+                return waited
+            pause = 60 - (now - self.calls[0][0])
+            time.sleep(pause)
+            waited += pause
+
+
+def _stop_requested(migration: EmbeddingMigration) -> bool:
+    status = EmbeddingMigration.objects.filter(pk=migration.pk).values_list('status', flat=True).first()
+    return status in _STOP_STATUSES
+
+
+def _pending_chunks(alias: str, after_id: int, batch_size: int) -> list[Chunk]:
+    qs = Chunk.objects.using(alias).filter(id__gt=after_id).exclude(embedding__isnull=True)
+    qs = qs.only('id', 'document_id', 'text', 'span_start', 'span_end').order_by('id')
+    # Dual-written chunks already carry the new vector, but still advance the checkpoint.
+    qs = qs.annotate(
+        span_text=spans.span_text_expression(),
+        has_next=ExpressionWrapper(Q(embedding_next__isnull=False), output_field=BooleanField()),
+    )
+    return list(qs[:batch_size])
+
+
+def run(migration: EmbeddingMigration, batch_size: int | None = None) -> EmbeddingMigration:
+    """Re-embed every chunk with the target model, from the stored checkpoints, within the rate budget."""
+    if _stop_requested(migration):
+        # Paused or cancelled while queued.
+        migration.refresh_from_db(fields=['status'])
+        return migration
+    batch_size = batch_size or settings.REEMBED_BATCH_SIZE
+    throttle = Throttle(settings.REEMBED_TOKENS_PER_MINUTE, settings.REEMBED_REQUESTS_PER_MINUTE)
+    usage = usage_service.new_usage()
+    migration.status = EmbeddingMigration.Status.RUNNING
+    migration.started_at = migration.started_at or timezone.now()
+    migration.error_message = None
+    migration.save(update_fields=['status', 'started_at', 'error_message'])
+    last_tick = time.monotonic()
+
+    try:
+        for alias in shards.write_aliases():
+            while True:
+                if _stop_requested(migration):
+                    logger.info('Embedding migration %s stopped at %s', migration.pk, migration.checkpoints)
+                    migration.refresh_from_db(fields=['status'])
+                    return migration
+                batch = _pending_chunks(alias, migration.checkpoints.get(alias, 0), batch_size)
+                if not batch:
+                    break
+                pending = [chunk for chunk in batch if not chunk.has_next]
+                if pending:
+                    texts = spans.chunk_texts(pending)
+                    throttle.wait(sum(usage_service.estimate_tokens(text) for text in texts))
+                    vectors = llm_client.embed_texts(texts, usage=usage, model=migration.target_model)
+                    bulk_load.update_next_embeddings(pending, vectors, using=alias)
+
+                now = time.monotonic()
+                migration.checkpoints[alias] = batch[-1].id
+                migration.chunks_scanned += len(batch)
+                migration.chunks_embedded += len(pending)
+                migration.embedding_tokens += usage['embedding_tokens']
+                migration.cost_usd += usage['cost_usd']
+                migration.elapsed_s += now - last_tick
+                last_tick = now
+                usage = usage_service.new_usage()
+                migration.save(update_fields=[
+                    'checkpoints', 'chunks_scanned', 'chunks_embedded', 'embedding_tokens', 'cost_usd', 'elapsed_s',
+                ])
+    except Exception as exc:
+        migration.status = EmbeddingMigration.Status.FAILED
+        migration.error_message = str(exc)
+        migration.save(update_fields=['status', 'error_message'])
+        raise
+
+    migration.status = EmbeddingMigration.Status.READY
+    migration.finished_at = timezone.now()
+    migration.save(update_fields=['status', 'finished_at'])
+    return migration
+
+
+def coverage(target_model: str | None = None) -> dict:
+    total = 0
+    missing = 0
+    for alias in shards.write_aliases():
+        embedded = Chunk.objects.using(alias).exclude(embedding__isnull=True)
+        total += embedded.count()
+        pending = embedded.filter(embedding_next__isnull=True)
+        if target_model:
+            # Chunks already holding the target vector (written after the switch, or swapped by a switch
+            # whose commit on another database failed) count as covered.
+            pending = pending.exclude(embed_model=target_model)
+        missing += pending.count()
+    return {
+        'total': total,
+        'covered': total - missing,
+        'missing': missing,
+        'percent': round(100 * (total - missing) / total, 2) if total else 100.0,
+    }
+
+
+def _next_centroids(alias: str, routed: set[int], target_model: str) -> dict[int, list]:
+    # Routing centroids are rebuilt from the new vectors inside the switch so they flip together.
+    # A chunk already carrying the target vector in ``embedding`` contributes that instead.
+    rows = Chunk.objects.using(alias).filter(document_id__in=routed).filter(
+        Q(embedding_next__isnull=False) | Q(embed_model=target_model, embedding__isnull=False)
+    )
+    rows = rows.order_by('document_id').values_list('document_id', 'embedding_next', 'embedding').iterator()
+    return {
+        document_id: routing.centroid([
+            next_vector if next_vector is not None else vector for _, next_vector, vector in doc_rows
+        ])
+        for document_id, doc_rows in groupby(rows, key=itemgetter(0))
+    }
+
+
+def _swap(alias: str, target_model: str, batch_size: int) -> int:
+    """Move ``embedding_next`` into ``embedding`` in id-ordered UPDATEs of ``batch_size`` rows."""
+    chunks = Chunk.objects.using(alias)
+    values = {'embedding': F('embedding_next'), 'embedding_next': None, 'embed_model': target_model}
+    swapped = 0
+    while True:
+        batch = chunks.exclude(embedding_next__isnull=True).order_by('pk').values('pk')[:batch_size]
+        count = chunks.filter(pk__in=batch).update(**values)
+        swapped += count
+        if count < batch_size:
+            return swapped
+
+
+def _lock_chunks(alias: str) -> None:
+    # Blocks concurrent chunk writes (dual writes) until the swap commits; searches keep reading the
+    # committed source vectors meanwhile, since SHARE ROW EXCLUSIVE does not conflict with SELECT.
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {Chunk._meta.db_table} IN SHARE ROW EXCLUSIVE MODE")
+
+
+def switch(migration: EmbeddingMigration, batch_size: int | None = None) -> dict:
+    """Make the target model live: swap every chunk's vectors and flip the active model atomically.
+
+    One transaction per database stays open until every swap, the centroids and the flip are done,
+    so nothing is visible half-switched and any error rolls everything back with both vectors intact.
+    Searches keep running on the source vectors throughout; only chunk writes wait. The swap runs in
+    ``REEMBED_SWAP_BATCH_SIZE``-row statements to bound each one's memory.
+    """
+    if migration.status != EmbeddingMigration.Status.READY:
+        raise ValueError(f"Migration is {migration.status}; only a READY migration can switch.")
+    covered = coverage(migration.target_model)
+    if covered['missing']:
+        raise ValueError(f"{covered['missing']} chunks have no {migration.target_model} vector yet; resume the job.")
+
+    batch_size = batch_size or settings.REEMBED_SWAP_BATCH_SIZE
+    swapped = 0
+    centroids = {}
+    with ExitStack() as stack:
+        # Blocks exit in reverse, so shards commit before the primary's flip. If the primary then fails
+        # to commit, the migration is still READY and switching again finishes the job: coverage and
+        # centroids accept chunks that already carry the target vector.
+        for alias in shards.write_aliases():
+            stack.enter_context(transaction.atomic(using=alias))
+            _lock_chunks(alias)
+        routed = set(Document.objects.exclude(embedding__isnull=True).values_list('id', flat=True))
+        for alias in shards.write_aliases():
+            centroids.update(_next_centroids(alias, routed, migration.target_model))
+            swapped += _swap(alias, migration.target_model, batch_size)
+        documents = Document.objects.in_bulk(list(centroids))
+        updated = []
+        for document_id, centroid in centroids.items():
+            document = documents.get(document_id)
+            if document is None:
+                # Deleted since the routed set was read.
+                continue
+            document.embedding = centroid
+            updated.append(document)
+        Document.objects.bulk_update(updated, ['embedding'], batch_size=1000)
+        migration.status = EmbeddingMigration.Status.SWITCHED
+        migration.switched_at = timezone.now()
+        migration.save(update_fields=['status', 'switched_at'])
+    _active['checked_at'] = float('-inf')
+    return {'swapped': swapped, 'centroids': len(centroids), 'model': migration.target_model}
+
+
+def cancel(migration: EmbeddingMigration) -> int:
+    if migration.status not in DUAL_WRITE_STATUSES:
+        raise ValueError(f"Migration is {migration.status}; nothing to cancel.")
+    EmbeddingMigration.objects.filter(pk=migration.pk).update(
+        status=EmbeddingMigration.Status.CANCELLED,
+        finished_at=timezone.now(),
+    )
+    return sum(
+        Chunk.objects.using(alias).exclude(embedding_next__isnull=True).update(embedding_next=None)
+        for alias in shards.write_aliases()
+    )
+
+
+def report(migration: EmbeddingMigration | None = None) -> dict:
+    migration = migration or EmbeddingMigration.objects.order_by('-id').first()
+    result = {'active_model': active_model(fresh=True), 'migration': None}
+    if migration is None:
+        return result
+    chunks_per_s = migration.chunks_scanned / migration.elapsed_s if migration.elapsed_s else 0.0
+    remaining = max(migration.chunks_total - migration.chunks_scanned, 0)
+    result['migration'] = {
+        'id': migration.id,
+        'source_model': migration.source_model,
+        'target_model': migration.target_model,
+        'status': migration.status,
+        'chunks_total': migration.chunks_total,
+        'chunks_scanned': migration.chunks_scanned,
+        'chunks_embedded': migration.chunks_embedded,
+        'embedding_tokens': migration.embedding_tokens,
+        'cost_usd': round(migration.cost_usd, 6),
+        'elapsed_s': round(migration.elapsed_s, 2),
+        'chunks_per_s': round(chunks_per_s, 2),
+        'tokens_per_min': round(migration.embedding_tokens / migration.elapsed_s * 60) if migration.elapsed_s else 0,
+        'eta_s': round(remaining / chunks_per_s) if chunks_per_s and migration.status in DUAL_WRITE_STATUSES else None,
+        'checkpoints': migration.checkpoints,
+        'started_at': migration.started_at,
+        'finished_at': migration.finished_at,
+        'switched_at': migration.switched_at,
+        'error_message': migration.error_message,
+    }
+    if migration.status in DUAL_WRITE_STATUSES:
+        result['migration']['coverage'] = coverage(migration.target_model)
+    return result
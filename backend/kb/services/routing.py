@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def centroid(vectors) -> np.ndarray | None:
+    """Unit-length mean direction of ``vectors``: the document's routing embedding."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.size == 0:
+        return None
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mean = (matrix / norms).mean(axis=0)
+    length = np.linalg.norm(mean)
+    return mean / length if length else mean
+
+
+def block_centroids(matrix, norms, groups, group_count: int, block_rows: int = 65536) -> np.ndarray:
+    """Centroids of ``matrix`` rows grouped by ``groups``, reading the (possibly memory-mapped) rows in blocks."""
+    sums = np.zeros((group_count, matrix.shape[1]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_rows):
+        rows = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        row_norms = np.asarray(norms[start:start + block_rows], dtype=np.float32)[:, None]
+        row_norms = np.where(row_norms == 0, 1.0, row_norms)
+        np.add.at(sums, np.asarray(groups[start:start + block_rows]), rows / row_norms)
+    lengths = np.linalg.norm(sums, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return sums / lengths
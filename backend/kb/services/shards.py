@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+
+from ..models import Chunk, Document
+
+SHARD_PREFIX = 'shard_'
+PRIMARY = 'default'
+# Documents copied onto a shard carry every column except the self reference, which may point off-shard.
+_COPY_EXCLUDE = {'id', 'duplicate_of_id'}
+
+_executor = None
+_executor_lock = threading.Lock()
+_legacy = {'checked_at': 0.0, 'present': True}
+
+
+def shard_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith(SHARD_PREFIX)]
+
+
+def sharding_enabled() -> bool:
+    return bool(shard_aliases())
+
+
+def target_shard(doc_id: int, aliases: list[str] | None = None) -> str:
+    """Rendezvous hash: adding or draining a shard only moves the documents that must move."""
+    aliases = shard_aliases() if aliases is None else aliases
+    if not aliases:
+        return PRIMARY
+    return max(aliases, key=lambda alias: hashlib.sha1(f"{alias}:{doc_id}".encode('utf-8')).digest())
+
+
+def chunk_alias(document: Document) -> str:
+    # Chunks indexed before sharding (or with it off) stay on the primary until rebalanced.
+    return document.shard or PRIMARY
+
+
+def chunks(document: Document):
+    return Chunk.objects.using(chunk_alias(document)).filter(document_id=document.id)
+
+
+def assign(document: Document) -> str:
+    """Pick and persist the shard a (re)indexed document is written to."""
+    if not sharding_enabled():
+        return chunk_alias(document)
+    placement = document.shard if document.shard in shard_aliases() else target_shard(document.id)
+    if document.shard != placement:
+        document.shard = placement
+        Document.objects.filter(pk=document.pk).update(shard=placement)
+    return placement
+
+
+def atomic(alias: str):
+    # The primary is already covered by the caller's transaction.
+    return nullcontext() if alias == PRIMARY else transaction.atomic(using=alias)
+
+
+def sync_document(document: Document, alias: str) -> None:
+    """Mirror the document row onto its shard so chunk foreign keys and span-text joins resolve there."""
+    if alias == PRIMARY:
+        return
+    fields = {
+        field.attname: getattr(document, field.attname)
+        for field in Document._meta.concrete_fields
+        if field.attname not in _COPY_EXCLUDE
+    }
+    Document.objects.using(alias).update_or_create(pk=document.pk, defaults=fields)
+
+
+def drop_document(document: Document, alias: str | None = None) -> None:
+    """Delete the document's chunks from where they live; on a shard the mirrored row goes too."""
+    alias = alias or chunk_alias(document)
+    if alias == PRIMARY:
+        Chunk.objects.filter(document_id=document.id).delete()
+    else:
+        Document.objects.using(alias).filter(pk=document.pk).delete()
+
+
+def _legacy_chunks_present() -> bool:
+    # Cached so an unfiltered search does not pay for the check on every request.
+    now = time.monotonic()
+    if now - _legacy['checked_at'] >= settings.VECTOR_SHARD_MAP_TTL:
+        _legacy['present'] = Document.objects.filter(
+            shard__isnull=True,
+            duplicate_of__isnull=True,
+            chunks_count__gt=0,
+        ).exists()
+        _legacy['checked_at'] = now
+    return _legacy['present']
+
+
+def read_aliases(doc_ids: list[int] | None = None) -> list[str]:
+    """Databases a search must visit; the primary maps to a replica inside ``replica_reads``."""
+    if not sharding_enabled():
+        return [router.db_for_read(Chunk)]
+    if doc_ids is None:
+        aliases = shard_aliases()
+        if _legacy_chunks_present():
+            aliases = [PRIMARY] + aliases
+    else:
+        placed = set(Document.objects.filter(id__in=doc_ids).values_list('shard', flat=True))
+        aliases = sorted(alias or PRIMARY for alias in placed) or [PRIMARY]
+    return [router.db_for_read(Chunk) if alias == PRIMARY else alias for alias in aliases]
+
+
+def write_aliases() -> list[str]:
+    return [PRIMARY] + shard_aliases()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Long-lived threads keep their per-thread Django connections open between searches.
+            workers = settings.VECTOR_SHARD_PARALLELISM or len(shard_aliases()) + 1
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kb-shard')
+        return _executor
+
+
+def _pooled(func, alias: str):
+    # Pool threads never see request_started/finished, so apply CONN_MAX_AGE and drop broken
+    # connections here; otherwise one failover leaves the thread failing every later search.
+    close_old_connections()
+    try:
+        return func(alias)
+    finally:
+        close_old_connections()
+
+
+def scatter(func, aliases: list[str]) -> list:
+    """Run ``func(alias)`` for every alias in parallel; results come back in ``aliases`` order."""
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+    futures = [_pool().submit(_pooled, func, alias) for alias in aliases]
+    return [future.result() for future in futures]
@@ -0,0 +1,340 @@
+"""Columnar index snapshots.
+
+A snapshot is a directory of flat little-endian arrays plus JSON metadata:
+
+- ``manifest.json``: format version, embedding model and dimensions, row count
+- ``documents.json``: one entry per document; chunks refer to it by position
+- ``embeddings.f32``: ``rows x dims`` float32 matrix
+- ``norms.f32``: L2 norm of every embedding row
+- ``doc_ref.i32`` / ``chunk_index.i32``: per-row document position and chunk index
+- ``text.bin`` + ``text_offsets.i64``: UTF-8 chunk text and ``rows + 1`` byte offsets
+
+Every array can be opened with ``numpy.memmap`` so the local backend starts without
+loading the index into memory.
+"""
+import itertools
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from django.db import transaction
+
+from ..models import DEFAULT_COLLECTION, Chunk, Document
+from . import bulk_load, reembed, routing, shards, spans
+
+FORMAT_VERSION = 1
+# Swapped into place in this order; the manifest goes last so readers never see it ahead of its data.
+_FILES = (
+    'embeddings.f32', 'norms.f32', 'doc_ref.i32', 'chunk_index.i32', 'text.bin', 'text_offsets.i64',
+    'documents.json', 'manifest.json',
+)
+
+
+def _path(root: str, name: str) -> str:
+    return os.path.join(root, name)
+
+
+def _staged(root: str, name: str) -> str:
+    return _path(root, name) + '.tmp'
+
+
+def _version(root: str) -> int:
+    return os.stat(_path(root, 'manifest.json')).st_mtime_ns
+
+
+def export_snapshot(root: str, collection: str | None = None, batch_size: int = 2000) -> dict:
+    """Write the snapshot as ``*.tmp`` siblings of its files, then swap them in with the manifest last.
+
+    Replacing (rather than truncating) the files leaves the old inodes intact for processes that
+    still have them mapped; the new manifest mtime tells ``load`` to reopen.
+    """
+    os.makedirs(root, exist_ok=True)
+
+    def chunk_rows(alias):
+        chunks = Chunk.objects.using(alias).exclude(embedding__isnull=True).order_by('document_id', 'chunk_index')
+        if collection:
+            chunks = chunks.filter(collection=collection)
+        return chunks.annotate(span_text=spans.span_text_expression()).values_list(
+            'document_id', 'chunk_index', 'text', 'embedding', 'span_start', 'span_end', 'span_text',
+        ).iterator(chunk_size=batch_size)
+
+    doc_positions = {}
+    documents = []
+    offsets = [0]
+    rows = 0
+    dims = None
+    with open(_staged(root, 'embeddings.f32'), 'wb') as emb_out, \
+            open(_staged(root, 'norms.f32'), 'wb') as norm_out, \
+            open(_staged(root, 'doc_ref.i32'), 'wb') as ref_out, \
+            open(_staged(root, 'chunk_index.i32'), 'wb') as index_out, \
+            open(_staged(root, 'text.bin'), 'wb') as text_out:
+
+        def flush(vectors, refs, indexes):
+            if not vectors:
+                return
+            matrix = np.asarray(vectors, dtype='<f4')
+            matrix.tofile(emb_out)
+            np.linalg.norm(matrix, axis=1).astype('<f4').tofile(norm_out)
+            np.asarray(refs, dtype='<i4').tofile(ref_out)
+            np.asarray(indexes, dtype='<i4').tofile(index_out)
+
+        vectors, refs, indexes = [], [], []
+        compressed_source = None
+        # A document's chunks live on exactly one shard, so rows stay grouped by document.
+        rows_iter = itertools.chain.from_iterable(chunk_rows(alias) for alias in shards.write_aliases())
+        for document_id, chunk_index, text, embedding, span_start, span_end, span_text in rows_iter:
+            if document_id not in doc_positions:
+                doc_positions[document_id] = len(documents)
+                documents.append(document_id)
+                compressed_source = None
+            if span_start is not None:
+                if span_text is None:
+                    # Rows arrive grouped by document, so each compressed source is inflated once.
+                    if compressed_source is None:
+                        compressed_source = spans.source_text(Document.objects.get(pk=document_id)) or ''
+                    span_text = compressed_source[span_start:span_end]
+                text = span_text
+            vectors.append(embedding)
+            refs.append(doc_positions[document_id])
+            indexes.append(chunk_index)
+            encoded = text.encode('utf-8')
+            text_out.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            rows += 1
+            dims = dims or len(embedding)
+            if len(vectors) >= batch_size:
+                flush(vectors, refs, indexes)
+                vectors, refs, indexes = [], [], []
+        flush(vectors, refs, indexes)
+
+    np.asarray(offsets, dtype='<i8').tofile(_staged(root, 'text_offsets.i64'))
+
+    doc_rows = Document.objects.in_bulk(documents)
+    doc_meta = []
+    for document_id in documents:
+        document = doc_rows[document_id]
+        doc_meta.append({
+            'id': document.id,
+            'title': document.title,
+            'collection': document.collection,
+            'original_filename': document.original_filename,
+            'content_hash': document.content_hash,
+            'raw_text': spans.source_text(document),
+            'file': document.file.name if document.file else None,
+        })
+    with open(_staged(root, 'documents.json'), 'w', encoding='utf-8') as handle:
+        json.dump(doc_meta, handle)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'embed_model': reembed.active_model(),
+        'dims': dims or 0,
+        'rows': rows,
+        'documents': len(doc_meta),
+        'collection': collection,
+    }
+    with open(_staged(root, 'manifest.json'), 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2)
+    for name in _FILES:
+        os.replace(_staged(root, name), _path(root, name))
+    return manifest
+
+
+class Snapshot:
+    def __init__(self, root: str):
+        self.version = _version(root)
+        with open(_path(root, 'manifest.json'), encoding='utf-8') as handle:
+            self.manifest = json.load(handle)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {self.manifest.get('format_version')}")
+        with open(_path(root, 'documents.json'), encoding='utf-8') as handle:
+            self.documents = json.load(handle)
+
+        rows = self.manifest['rows']
+        dims = self.manifest['dims']
+        self.rows = rows
+        self.embeddings = self._map(root, 'embeddings.f32', '<f4', (rows, dims))
+        self.norms = self._map(root, 'norms.f32', '<f4', (rows,))
+        self.doc_ref = self._map(root, 'doc_ref.i32', '<i4', (rows,))
+        self.chunk_index = self._map(root, 'chunk_index.i32', '<i4', (rows,))
+        self.text_offsets = self._map(root, 'text_offsets.i64', '<i8', (rows + 1,))
+        self.text = self._map(root, 'text.bin', 'u1', None)
+        self.doc_ids = np.asarray([doc['id'] for doc in self.documents], dtype=np.int64)
+        self.doc_collections = np.asarray([doc['collection'] or DEFAULT_COLLECTION for doc in self.documents])
+        self._doc_centroids = None
+        self._centroids_lock = threading.Lock()
+
+    @staticmethod
+    def _map(root: str, name: str, dtype: str, shape):
+        path = _path(root, name)
+        if os.path.getsize(path) == 0:
+            return np.zeros(shape or (0,), dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def chunk_text(self, row: int) -> str:
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self.text[start:end]).decode('utf-8')
+
+    @property
+    def doc_centroids(self) -> np.ndarray:
+        # Built on first use in one blocked pass over the memmap, so startup stays lazy.
+        with self._centroids_lock:
+            if self._doc_centroids is None:
+                self._doc_centroids = routing.block_centroids(
+                    self.embeddings, self.norms, self.doc_ref, len(self.documents),
+                ) if self.rows else np.zeros((len(self.documents), 0), dtype=np.float32)
+            return self._doc_centroids
+
+    def _allowed(self, collection: str, doc_ids=None, exclude_ids=None) -> np.ndarray:
+        allowed = self.doc_collections == collection
+        if doc_ids is not None:
+            allowed &= np.isin(self.doc_ids, list(doc_ids))
+        if exclude_ids:
+            allowed &= ~np.isin(self.doc_ids, list(exclude_ids))
+        return allowed
+
+    def query_documents(
+        self, question_embedding, top_n: int, collection: str, doc_ids=None, exclude_ids=None,
+    ) -> list[tuple[int, float]]:
+        if self.rows == 0:
+            return []
+        query = np.asarray(question_embedding, dtype=np.float32)
+        scores = 1.0 - (self.doc_centroids @ query) / (np.linalg.norm(query) or 1.0)
+        scores[~self._allowed(collection, doc_ids, exclude_ids)] = np.inf
+        top_n = min(top_n, int(np.isfinite(scores).sum()))
+        if top_n <= 0:
+            return []
+        positions = np.argpartition(scores, top_n - 1)[:top_n]
+        positions = positions[np.argsort(scores[positions])]
+        return [(int(self.doc_ids[position]), float(scores[position])) for position in positions]
+
+    def query(
+        self,
+        question_embedding,
+        top_k: int,
+        collection: str,
+        doc_ids=None,
+        include_embeddings: bool = False,
+        exclude_ids=None,
+    ):
+        if self.rows == 0:
+            scores = np.zeros(0, dtype=np.float32)
+        else:
+            query = np.asarray(question_embedding, dtype=np.float32)
+            norms = self.norms * (np.linalg.norm(query) or 1.0)
+            norms[norms == 0] = 1.0
+            scores = 1.0 - (self.embeddings @ query) / norms
+            scores[~self._allowed(collection, doc_ids, exclude_ids)[self.doc_ref]] = np.inf
+
+        top_k = min(top_k, int(np.isfinite(scores).sum()))
+        if top_k <= 0:
+            rows = np.zeros(0, dtype=np.int64)
+        else:
+            rows = np.argpartition(scores, top_k - 1)[:top_k]
+            rows = rows[np.argsort(scores[rows])]
+
+        documents = []
+        metadatas = []
+        distances = []
+        embeddings = []
+        for row in rows:
+            doc = self.documents[self.doc_ref[row]]
+            documents.append(self.chunk_text(row))
+            metadatas.append({
+                'doc_id': doc['id'],
+                'doc_title': doc['title'],
+                'doc_filename': doc['original_filename'] or doc['file'] or 'unknown',
+                'doc_content_hash': doc['content_hash'],
+                'chunk_index': int(self.chunk_index[row]),
+            })
+            distances.append(float(scores[row]))
+            if include_embeddings:
+                embeddings.append(np.asarray(self.embeddings[row]))
+
+        results = {
+            'documents': documents,
+            'metadatas': metadatas,
+            'distances': distances,
+            'search_passes': 1,
+            'database': 'snapshot',
+        }
+        if include_embeddings:
+            results['embeddings'] = embeddings
+        return results
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def load(root: str) -> Snapshot:
+    """The snapshot at ``root``, reopened when a new export has replaced its manifest."""
+    version = _version(root)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(root)
+        if snapshot is None or snapshot.version != version:
+            # Searches still holding the previous Snapshot keep reading its (replaced) files.
+            snapshot = _snapshots[root] = Snapshot(root)
+        return snapshot
+
+
+def import_snapshot(root: str, batch_size: int = 1000, allow_model_mismatch: bool = False) -> dict:
+    from ..rag_core import _chunk_vector_id
+
+    snapshot = Snapshot(root)
+    embed_model = reembed.active_model()
+    if snapshot.manifest['embed_model'] != embed_model and not allow_model_mismatch:
+        raise ValueError(
+            f"Snapshot was built with {snapshot.manifest['embed_model']}, "
+            f"but the live embedding model is {embed_model}."
+        )
+
+    rows_by_doc = np.bincount(snapshot.doc_ref, minlength=len(snapshot.documents)) if snapshot.rows else []
+    centroids = snapshot.doc_centroids
+    with transaction.atomic():
+        created = Document.objects.bulk_create([
+            Document(
+                title=doc['title'],
+                collection=doc['collection'] or DEFAULT_COLLECTION,
+                original_filename=doc['original_filename'],
+                content_hash=doc['content_hash'],
+                raw_text=doc['raw_text'],
+                file=doc['file'],
+                status=Document.Status.INDEXED,
+                chunks_count=int(rows_by_doc[position]) if snapshot.rows else 0,
+                embedding=centroids[position] if snapshot.rows and rows_by_doc[position] else None,
+                last_indexed_at=datetime.now(timezone.utc),
+            )
+            for position, doc in enumerate(snapshot.documents)
+        ])
+        if shards.sharding_enabled():
+            for document in created:
+                document.shard = shards.target_shard(document.id)
+                shards.sync_document(document, document.shard)
+            Document.objects.bulk_update(created, ['shard'], batch_size=batch_size)
+
+        for start in range(0, snapshot.rows, batch_size):
+            end = min(start + batch_size, snapshot.rows)
+            batches = {}
+            for row in range(start, end):
+                document = created[snapshot.doc_ref[row]]
+                chunk_index = int(snapshot.chunk_index[row])
+                text = snapshot.chunk_text(row)
+                chunks, rows = batches.setdefault(shards.chunk_alias(document), ([], []))
+                chunks.append(Chunk(
+                    document=document,
+                    collection=document.collection,
+                    chunk_index=chunk_index,
+                    text=text,
+                    vector_id=_chunk_vector_id(document.id, chunk_index, text),
+                    embed_model=snapshot.manifest['embed_model'],
+                ))
+                rows.append(row)
+            for alias, (chunks, rows) in batches.items():
+                embeddings = snapshot.embeddings[start:end] if len(batches) == 1 else snapshot.embeddings[rows]
+                bulk_load.load_chunks(chunks, embeddings, using=alias)
+
+    return {'documents': len(created), 'chunks': snapshot.rows}
@@ -0,0 +1,70 @@
+import zlib
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Substr
+
+from ..models import Document
+
+
+def compress(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), settings.SOURCE_COMPRESSION_LEVEL)
+
+
+def decompress(blob) -> str:
+    return zlib.decompress(bytes(blob)).decode('utf-8')
+
+
+def source_text(document: Document) -> str | None:
+    if document.raw_text:
+        return document.raw_text
+    if document.source_compressed:
+        return decompress(document.source_compressed)
+    return None
+
+
+def store_source(document: Document, text: str) -> list[str]:
+    """Keep the single copy of ``text`` that span chunks are sliced from; returns the changed fields."""
+    if settings.SOURCE_COMPRESSION:
+        document.raw_text = None
+        document.source_compressed = compress(text)
+    else:
+        document.raw_text = text
+        document.source_compressed = None
+    return ['raw_text', 'source_compressed']
+
+
+def span_text_expression():
+    # NULL for stored-text chunks (no span) and for compressed sources, which are sliced in Python.
+    return Substr('document__raw_text', F('span_start') + 1, F('span_end') - F('span_start'))
+
+
+def with_span_text(qs):
+    """Annotate chunks with their slice of the source; the joined document's bulky columns stay in the database."""
+    return qs.defer(
+        'document__raw_text',
+        'document__source_compressed',
+        'document__embedding',
+    ).annotate(span_text=span_text_expression())
+
+
+def chunk_texts(chunks) -> list[str]:
+    texts = []
+    missing = {}
+    for position, chunk in enumerate(chunks):
+        if chunk.span_start is None:
+            texts.append(chunk.text)
+        elif getattr(chunk, 'span_text', None) is not None:
+            texts.append(chunk.span_text)
+        else:
+            texts.append(None)
+            missing.setdefault(chunk.document_id, []).append(position)
+    if missing:
+        # One query and one decompression per document, however many of its chunks were hit.
+        sources = Document.objects.db_manager(chunks[0]._state.db).filter(id__in=missing)
+        for doc_id, blob in sources.values_list('id', 'source_compressed'):
+            source = decompress(blob) if blob else ''
+            for position in missing[doc_id]:
+                chunk = chunks[position]
+                texts[position] = source[chunk.span_start:chunk.span_end]
+    return texts
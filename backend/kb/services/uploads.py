@@ -0,0 +1,45 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+
+from . import parsers
+
+
+def hash_upload(file_obj) -> str:
+    digest = hashlib.sha256()
+    for block in file_obj.chunks(settings.UPLOAD_STREAM_CHUNK_SIZE):
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def spool_upload(file_obj, filename: str) -> tuple[str, str]:
+    """Stream an upload to the shared spool directory, hashing it on the way.
+
+    Returns ``(spool_path, sha256_hex)``. The worker parses the spooled file later,
+    so the request never holds the whole upload in memory.
+    """
+    ext = parsers.ensure_supported(filename)
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=settings.UPLOAD_SPOOL_DIR, suffix=ext, delete=False) as handle:
+        try:
+            for block in file_obj.chunks(settings.UPLOAD_STREAM_CHUNK_SIZE):
+                digest.update(block)
+                handle.write(block)
+        except Exception:
+            handle.close()
+            os.remove(handle.name)
+            raise
+    return handle.name, digest.hexdigest()
+
+
+def discard_spool(path: str | None) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,106 @@
+import logging
+import math
+from datetime import date, timedelta
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough English average; used only for pre-flight budget checks, never for billing.
+CHARS_PER_TOKEN = 4
+METRICS_TTL = 90 * 24 * 3600
+COUNTERS = ('embedding_tokens', 'prompt_tokens', 'completion_tokens')
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        # record() runs inline on every provider call; a stalled Redis must not stall the request with it.
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.USAGE_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.USAGE_REDIS_TIMEOUT,
+        )
+    return _client
+
+
+def _metrics_key(day: date) -> str:
+    return f"kb:usage:{day.isoformat()}"
+
+
+def new_usage() -> dict:
+    return {'embedding_tokens': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_embedding(usage: dict, texts: list[str]) -> list[dict]:
+    """Share one batched embedding call's tokens across its texts, weighted by their estimated size."""
+    weights = [max(1, estimate_tokens(text)) for text in texts]
+    total = usage['embedding_tokens']
+    shares = [total * weight // sum(weights) for weight in weights]
+    # Hand the rounding remainder to the longest texts so the shares add up to the batch.
+    for index in sorted(range(len(texts)), key=lambda i: weights[i], reverse=True)[:total - sum(shares)]:
+        shares[index] += 1
+    return [
+        {**new_usage(), 'embedding_tokens': share, 'cost_usd': cost_usd('embedding', share)}
+        for share in shares
+    ]
+
+
+def cost_usd(kind: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    if kind == 'embedding':
+        return prompt_tokens * settings.EMBED_COST_PER_1M_TOKENS / 1_000_000
+    return (
+        prompt_tokens * settings.CHAT_INPUT_COST_PER_1M_TOKENS
+        + completion_tokens * settings.CHAT_OUTPUT_COST_PER_1M_TOKENS
+    ) / 1_000_000
+
+
+def record(kind: str, prompt_tokens: int, completion_tokens: int = 0, usage: dict | None = None) -> dict:
+    """Account one provider call: add it to ``usage`` (if given) and to the daily counters."""
+    cost = cost_usd(kind, prompt_tokens, completion_tokens)
+    delta = {
+        'embedding_tokens': prompt_tokens if kind == 'embedding' else 0,
+        'prompt_tokens': prompt_tokens if kind == 'chat' else 0,
+        'completion_tokens': completion_tokens,
+        'cost_usd': cost,
+    }
+    if usage is not None:
+        for key, value in delta.items():
+            usage[key] += value
+    try:
+        key = _metrics_key(date.today())
+        pipe = _redis().pipeline()
+        for counter in COUNTERS:
+            if delta[counter]:
+                pipe.hincrby(key, counter, delta[counter])
+        pipe.hincrbyfloat(key, 'cost_usd', cost)
+        pipe.hincrby(key, f"{kind}_calls", 1)
+        pipe.expire(key, METRICS_TTL)
+        pipe.execute()
+    except redis.RedisError:
+        logger.warning('Failed to record %s usage', kind, exc_info=True)
+    return delta
+
+
+def daily_metrics(days: int) -> list[dict]:
+    today = date.today()
+    day_list = [today - timedelta(days=offset) for offset in range(days)]
+    pipe = _redis().pipeline()
+    for day in day_list:
+        pipe.hgetall(_metrics_key(day))
+    metrics = []
+    for day, raw in zip(day_list, pipe.execute()):
+        values = {key.decode(): value.decode() for key, value in raw.items()}
+        entry = {'date': day.isoformat(), 'cost_usd': round(float(values.pop('cost_usd', 0)), 6)}
+        for counter in COUNTERS:
+            entry[counter] = int(values.pop(counter, 0))
+        entry.update({key: int(value) for key, value in values.items()})
+        metrics.append(entry)
+    return metrics
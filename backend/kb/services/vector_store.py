@@ -1,52 +1,329 @@
-﻿from django.db import connection
+﻿import hashlib
+import heapq
+import itertools
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
 from pgvector.django import CosineDistance
+from pgvector.utils import to_db
+
+from ..models import DEFAULT_COLLECTION, Chunk, Document, validate_collection
+from . import shards, snapshot, spans
 
-from ..models import Chunk
+ITERATIVE_SCAN_MODES = {'strict_order', 'relaxed_order'}
 
 
 def uses_pgvector() -> bool:
     return connection.vendor == 'postgresql'
 
 
+def collection_index_name(collection: str) -> str:
+    digest = hashlib.sha1(collection.encode('utf-8')).hexdigest()[:12]
+    return f"kb_chunk_hnsw_{digest}"
+
+
+def ensure_collection_index(collection: str, concurrently: bool = True) -> bool:
+    if not uses_pgvector():
+        return False
+    validate_collection(collection)
+    # Names are validated above, so inlining the literal keeps the predicate matchable by the planner.
+    concurrent_sql = 'CONCURRENTLY ' if concurrently else ''
+    for alias in shards.write_aliases():
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f"CREATE INDEX {concurrent_sql}IF NOT EXISTS {collection_index_name(collection)} ON kb_chunk "
+                f"USING hnsw (embedding vector_cosine_ops) WHERE collection = '{collection}'"
+            )
+    return True
+
+
 def upsert_chunks(ids, embeddings, documents, metadatas):
     # Embeddings are persisted directly on Chunk rows.
     return
 
 
-def query(question_embedding, top_k: int, where: dict | None = None):
-    qs = Chunk.objects.select_related('document').exclude(embedding__isnull=True)
-    if where:
-        doc_filter = where.get('doc_id')
-        if isinstance(doc_filter, dict) and '$in' in doc_filter:
-            qs = qs.filter(document_id__in=list(doc_filter['$in']))
+def _set_search_params(cursor, ef_search: int) -> None:
+    cursor.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+    if settings.VECTOR_ITERATIVE_SCAN in ITERATIVE_SCAN_MODES:
+        cursor.execute(f"SET LOCAL hnsw.iterative_scan = {settings.VECTOR_ITERATIVE_SCAN}")
+
+
+def _search(qs, top_k: int, filtered: bool):
+    if not uses_pgvector():
+        return list(qs[:top_k]), 1
+
+    # The HNSW scan applies the doc filter after the graph walk, so a selective
+    # filter can leave fewer than top_k rows; widen ef_search until it does not.
+    ef_search = settings.VECTOR_EF_SEARCH
+    passes = 0
+    with transaction.atomic(using=qs.db):
+        while True:
+            passes += 1
+            with connections[qs.db].cursor() as cursor:
+                _set_search_params(cursor, ef_search)
+            chunks = list(qs[:top_k])
+            if not filtered or len(chunks) >= top_k or ef_search >= settings.VECTOR_EF_SEARCH_MAX:
+                break
+            ef_search = min(ef_search * 2, settings.VECTOR_EF_SEARCH_MAX)
+    if settings.VECTOR_ITERATIVE_SCAN == 'relaxed_order':
+        chunks.sort(key=lambda chunk: chunk.distance)
+    return chunks, passes
 
-    qs = qs.annotate(distance=CosineDistance('embedding', question_embedding)).order_by('distance')[:top_k]
 
-    documents = []
+def _parse_where(where: dict | None):
+    where = where or {}
+    collection = where.get('collection') or DEFAULT_COLLECTION
+    doc_filter = where.get('doc_id')
+    doc_ids = None
+    if isinstance(doc_filter, dict) and '$in' in doc_filter:
+        doc_ids = list(doc_filter['$in'])
+    return collection, doc_ids
+
+
+def _deleting_ids(collection: str, doc_ids=None) -> list[int]:
+    # Read where Document lives (shards only mirror it), in the calling thread so replica routing applies.
+    qs = Document.objects.using(router.db_for_read(Document))
+    qs = qs.filter(collection=collection, status=Document.Status.DELETING)
+    if doc_ids is not None:
+        qs = qs.filter(id__in=doc_ids)
+    return list(qs.values_list('id', flat=True))
+
+
+_META_FIELDS = ('id', 'title', 'original_filename', 'file', 'content_hash', 'status')
+
+
+def _primary_documents(meta_alias: str | None, alias: str, rows) -> dict | None:
+    # Shard rows are mirrors refreshed only on (re)index, so citation metadata comes from the primary side.
+    if meta_alias is None or not alias.startswith(shards.SHARD_PREFIX):
+        return None
+    ids = {chunk.document_id for chunk, _ in rows}
+    return Document.objects.using(meta_alias).only(*_META_FIELDS).in_bulk(ids)
+
+
+def _pack_results(rows, include_embeddings: bool, passes: int, database: str, documents: dict | None = None) -> dict:
+    if documents is not None:
+        # A chunk whose document is gone from the primary is an orphan awaiting cleanup.
+        rows = [(chunk, distance) for chunk, distance in rows if chunk.document_id in documents]
+    texts = spans.chunk_texts([chunk for chunk, _ in rows])
     metadatas = []
     distances = []
+    embeddings = []
 
-    for chunk in qs:
-        document = chunk.document
+    for chunk, distance in rows:
+        document = chunk.document if documents is None else documents[chunk.document_id]
         filename = document.original_filename
         if not filename:
             filename = document.file.name if document.file else 'unknown'
-        documents.append(chunk.text)
         metadatas.append({
             'doc_id': document.id,
             'doc_title': document.title,
             'doc_filename': filename,
+            'doc_content_hash': document.content_hash,
             'chunk_index': chunk.chunk_index,
         })
-        distances.append(float(chunk.distance))
+        distances.append(float(distance))
+        if include_embeddings:
+            embeddings.append(chunk.embedding)
 
-    return {
-        'documents': documents,
+    results = {
+        'documents': texts,
         'metadatas': metadatas,
         'distances': distances,
+        'search_passes': passes,
+        'database': database,
     }
+    if include_embeddings:
+        results['embeddings'] = embeddings
+    return results
+
+
+def _merge_results(shard_results: list[dict], top_k: int, include_embeddings: bool) -> dict:
+    # Each shard returns its own top_k in distance order; a k-way heap merge keeps the global top_k.
+    keys = ('documents', 'metadatas', 'distances') + (('embeddings',) if include_embeddings else ())
+    ranked = heapq.merge(*(
+        [(distance, shard, row) for row, distance in enumerate(results['distances'])]
+        for shard, results in enumerate(shard_results)
+    ))
+    merged = {key: [] for key in keys}
+    for _, shard, row in itertools.islice(ranked, top_k):
+        for key in keys:
+            merged[key].append(shard_results[shard][key][row])
+    merged['search_passes'] = max(results['search_passes'] for results in shard_results)
+    merged['database'] = ','.join(results['database'] for results in shard_results)
+    return merged
+
+
+def query(question_embedding, top_k: int, where: dict | None = None, include_embeddings: bool = False):
+    collection, doc_ids = _parse_where(where)
+    if settings.VECTOR_SNAPSHOT_PATH:
+        # Local backend: brute-force search over a memory-mapped snapshot.
+        return snapshot.load(settings.VECTOR_SNAPSHOT_PATH).query(
+            question_embedding,
+            top_k,
+            collection,
+            doc_ids=doc_ids,
+            include_embeddings=include_embeddings,
+            exclude_ids=_deleting_ids(collection, doc_ids),
+        )
+    # Resolve aliases once so every ef_search pass hits the same (possibly replica) database.
+    aliases = shards.read_aliases(doc_ids)
+    meta_alias = _meta_alias()
+    exclude_ids = _deleting_ids(collection, doc_ids)
+    shard_results = shards.scatter(
+        lambda alias: _query_alias(
+            alias, question_embedding, top_k, collection, doc_ids, include_embeddings, meta_alias, exclude_ids,
+        ),
+        aliases,
+    )
+    if len(shard_results) == 1:
+        return shard_results[0]
+    return _merge_results(shard_results, top_k, include_embeddings)
+
+
+def _meta_alias() -> str | None:
+    # Resolved in the calling thread: replica routing does not follow the search onto scatter threads.
+    return router.db_for_read(Document) if shards.sharding_enabled() else None
+
+
+def _query_alias(
+    alias: str,
+    question_embedding,
+    top_k: int,
+    collection: str,
+    doc_ids,
+    include_embeddings: bool,
+    meta_alias: str | None = None,
+    exclude_ids=(),
+):
+    qs = spans.with_span_text(Chunk.objects.using(alias).select_related('document'))
+    qs = qs.filter(collection=collection).exclude(embedding__isnull=True)
+    if doc_ids is not None:
+        qs = qs.filter(document_id__in=doc_ids)
+    if exclude_ids:
+        # Documents being deleted keep chunks until the batches finish; filtering in the scan keeps top_k full.
+        qs = qs.exclude(document_id__in=exclude_ids)
+
+    qs = qs.annotate(distance=CosineDistance('embedding', question_embedding)).order_by('distance')
+    chunks, passes = _search(qs, top_k, doc_ids is not None or bool(exclude_ids))
+    rows = [(chunk, chunk.distance) for chunk in chunks]
+    return _pack_results(rows, include_embeddings, passes, alias, _primary_documents(meta_alias, alias, rows))
+
+
+def query_documents(question_embedding, top_n: int, where: dict | None = None) -> list[tuple[int, float]]:
+    """Nearest canonical documents by their centroid embedding, as ``(doc_id, distance)`` pairs."""
+    collection, doc_ids = _parse_where(where)
+    if settings.VECTOR_SNAPSHOT_PATH:
+        return snapshot.load(settings.VECTOR_SNAPSHOT_PATH).query_documents(
+            question_embedding,
+            top_n,
+            collection,
+            doc_ids=doc_ids,
+            exclude_ids=_deleting_ids(collection, doc_ids),
+        )
+    alias = router.db_for_read(Document)
+    qs = Document.objects.using(alias).filter(collection=collection, duplicate_of__isnull=True)
+    qs = qs.exclude(embedding__isnull=True).exclude(status=Document.Status.DELETING)
+    if doc_ids is not None:
+        qs = qs.filter(id__in=doc_ids)
+    qs = qs.annotate(distance=CosineDistance('embedding', question_embedding)).order_by('distance')
+    qs = qs.values_list('id', 'distance')
+    if not uses_pgvector():
+        return [(doc_id, float(distance)) for doc_id, distance in qs[:top_n]]
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            # The graph walk returns at most ef_search rows.
+            _set_search_params(cursor, max(settings.VECTOR_EF_SEARCH, top_n))
+        return [(doc_id, float(distance)) for doc_id, distance in qs[:top_n]]
+
+
+def query_many(question_embeddings, top_k: int, where: dict | None = None, include_embeddings: bool = False):
+    """Search several query vectors; on Postgres this is one LATERAL round trip plus one row fetch per shard."""
+    if len(question_embeddings) <= 1 or not uses_pgvector() or settings.VECTOR_SNAPSHOT_PATH:
+        return [query(embedding, top_k, where, include_embeddings) for embedding in question_embeddings]
+
+    collection, doc_ids = _parse_where(where)
+    aliases = shards.read_aliases(doc_ids)
+    meta_alias = _meta_alias()
+    exclude_ids = _deleting_ids(collection, doc_ids)
+    shard_results = shards.scatter(
+        lambda alias: _query_many_alias(
+            alias, question_embeddings, top_k, collection, doc_ids, include_embeddings, meta_alias, exclude_ids,
+        ),
+        aliases,
+    )
+    if len(shard_results) == 1:
+        return shard_results[0]
+    return [
+        _merge_results([results[position] for results in shard_results], top_k, include_embeddings)
+        for position in range(len(question_embeddings))
+    ]
+
+
+def _query_many_alias(
+    alias: str,
+    question_embeddings,
+    top_k: int,
+    collection: str,
+    doc_ids,
+    include_embeddings: bool,
+    meta_alias: str | None = None,
+    exclude_ids=(),
+):
+    table = Chunk._meta.db_table
+    params = [[to_db(embedding) for embedding in question_embeddings], collection]
+    doc_sql = ''
+    if doc_ids is not None:
+        doc_sql = f" AND {table}.document_id = ANY(%s)"
+        params.append(doc_ids)
+    if exclude_ids:
+        doc_sql += f" AND NOT ({table}.document_id = ANY(%s))"
+        params.append(list(exclude_ids))
+    params.append(top_k)
+    sql = (
+        f"SELECT q.ord, c.id, c.distance FROM unnest(%s::text[]) WITH ORDINALITY AS q(vec, ord) "
+        f"CROSS JOIN LATERAL ("
+        f"SELECT {table}.id, {table}.embedding <=> q.vec::vector AS distance FROM {table} "
+        f"WHERE {table}.collection = %s AND {table}.embedding IS NOT NULL{doc_sql} "
+        f"ORDER BY {table}.embedding <=> q.vec::vector LIMIT %s"
+        f") c ORDER BY q.ord, c.distance"
+    )
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            _set_search_params(cursor, settings.VECTOR_EF_SEARCH)
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+    chunks = spans.with_span_text(Chunk.objects.using(alias).select_related('document'))
+    chunks = chunks.in_bulk({chunk_id for _, chunk_id, _ in rows})
+    per_question = [[] for _ in question_embeddings]
+    for ordinal, chunk_id, distance in rows:
+        per_question[ordinal - 1].append((chunks[chunk_id], distance))
+    documents = _primary_documents(meta_alias, alias, [(chunk, None) for chunk in chunks.values()])
+
+    results = []
+    for embedding, question_rows in zip(question_embeddings, per_question):
+        if (doc_ids is not None or exclude_ids) and len(question_rows) < top_k:
+            # A selective doc filter starved the shared scan; retry with widening ef_search.
+            results.append(_query_alias(
+                alias, embedding, top_k, collection, doc_ids, include_embeddings, meta_alias, exclude_ids,
+            ))
+        else:
+            results.append(_pack_results(question_rows, include_embeddings, 1, alias, documents))
+    return results
+
 
+def delete_document_chunks(document_id: int, using: str | None = None, batch_size: int | None = None) -> int:
+    """Delete a document's chunks in bounded batches, each its own short statement and transaction.
 
-def delete_chunks(ids):
-    if ids:
-        Chunk.objects.filter(vector_id__in=ids).delete()
+    Every batch is one ``DELETE ... WHERE id IN (SELECT id ... LIMIT n)``, so ids never travel
+    through Python and no single statement holds row locks or WAL for the whole document.
+    """
+    chunks = Chunk.objects.using(using or shards.PRIMARY)
+    batch_size = batch_size or settings.DELETE_BATCH_SIZE
+    deleted = 0
+    while True:
+        batch = chunks.filter(document_id=document_id).values('pk')[:batch_size]
+        count, _ = chunks.filter(pk__in=batch).delete()
+        deleted += count
+        if count < batch_size:
+            return deleted
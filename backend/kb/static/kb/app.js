@@ -28,6 +28,27 @@
     return { ok: response.ok, status: response.status, data };
   }
 
+  // Follows an index job over its progress stream instead of polling; the events_url carries a signed
+  // token because EventSource cannot send the Authorization header.
+  function watchJob(eventsUrl, onFinished, onLost) {
+    const source = new EventSource(eventsUrl);
+    let finished = false;
+    source.addEventListener('progress', (event) => {
+      const payload = JSON.parse(event.data);
+      if (payload.status === 'DONE' || payload.status === 'FAILED') {
+        finished = true;
+        source.close();
+        onFinished();
+      }
+    });
+    source.onerror = () => {
+      if (!finished && source.readyState === EventSource.CLOSED) {
+        onLost();
+      }
+    };
+    return () => source.close();
+  }
+
   function useTheme() {
     const [theme, setTheme] = useState('dark');
 
@@ -215,7 +236,11 @@
         setMessage('');
         return;
       }
-      pollDoc(docId);
+      if (res.data && res.data.events_url) {
+        watchJob(res.data.events_url, () => pollDoc(docId), () => pollDoc(docId));
+      } else {
+        pollDoc(docId);
+      }
     };
 
     const handleUpload = async (event) => {
@@ -413,7 +438,11 @@
         setMessage('');
         return;
       }
-      pollDoc();
+      if (res.data && res.data.events_url) {
+        watchJob(res.data.events_url, () => pollDoc(), () => pollDoc());
+      } else {
+        pollDoc();
+      }
     };
 
     if (!doc) {
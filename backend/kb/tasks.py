@@ -1,44 +1,179 @@
-﻿from celery import shared_task
+﻿import time
+
+from celery import shared_task
 from celery import current_task
+from celery.signals import worker_process_init
+from django.conf import settings
 from django.utils import timezone
 
-from .models import Document, IndexJob
+from .models import Document, EmbeddingMigration, IndexJob
+from .services import progress, usage as usage_service
+
+
+def _progress_payload(job: IndexJob, started: float) -> dict:
+    elapsed = time.monotonic() - started
+    return {
+        'job_id': job.id,
+        'task_id': job.celery_task_id,
+        'document': job.document_id,
+        'status': job.status,
+        'chunks_total': job.chunks_total,
+        'chunks_embedded': job.chunks_embedded,
+        'chunks_written': job.chunks_written,
+        'embedding_tokens': job.embedding_tokens,
+        'cost_usd': round(job.cost_usd, 6),
+        'elapsed_s': round(elapsed, 2),
+        'chunks_per_s': round(job.chunks_embedded / elapsed, 2) if elapsed > 0 else 0.0,
+        'error_message': job.error_message,
+    }
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    from .warmup import warm_up
+
+    # Runs in each pool child before it takes tasks; index pages are warmed by the web processes.
+    warm_up('worker', prewarm_index=False)
+
+
+class DocumentDeleting(Exception):
+    def __str__(self):
+        return 'Document is being deleted.'
+
+
+def _save_job(job: IndexJob, fields: list[str]) -> None:
+    # An update rather than save(update_fields=...), which raises once a delete has cascaded to the job.
+    IndexJob.objects.filter(pk=job.pk).update(**{field: getattr(job, field) for field in fields})
+
+
+def _set_document_status(doc: Document, status: str, **fields) -> bool:
+    # Never overwrite DELETING: that would put a document being deleted back into listings and search.
+    return bool(
+        Document.objects.filter(pk=doc.pk).exclude(status=Document.Status.DELETING).update(
+            status=status, updated_at=timezone.now(), **fields,
+        )
+    )
+
+
 @shared_task
 def index_document_task(document_id):
     from .rag_core import index_document
 
-    doc = Document.objects.get(pk=document_id)
+    doc = Document.objects.filter(pk=document_id).exclude(status=Document.Status.DELETING).first()
+    if doc is None:
+        # Deleted (or claimed for deletion) while the task was queued.
+        return None
     job = IndexJob.objects.create(
         document=doc,
         status=IndexJob.Status.PENDING,
         celery_task_id=current_task.request.id,
     )
+    started = time.monotonic()
+    usage = usage_service.new_usage()
+
+    def report(parsed=None, embedded=None, written=None):
+        update_fields = []
+        if parsed is not None:
+            job.chunks_total = parsed
+            update_fields.append('chunks_total')
+        if embedded is not None:
+            job.chunks_embedded = embedded
+            job.embedding_tokens = usage['embedding_tokens']
+            job.cost_usd = usage['cost_usd']
+            update_fields.extend(['chunks_embedded', 'embedding_tokens', 'cost_usd'])
+        if written is not None:
+            job.chunks_written = written
+            update_fields.append('chunks_written')
+        _save_job(job, update_fields)
+        progress.publish(job.celery_task_id, _progress_payload(job, started))
+
     try:
         job.status = IndexJob.Status.RUNNING
         job.started_at = timezone.now()
-        job.save(update_fields=['status', 'started_at'])
+        _save_job(job, ['status', 'started_at'])
+        progress.publish(job.celery_task_id, _progress_payload(job, started))
 
-        doc.status = Document.Status.INDEXING
-        doc.error_message = None
-        doc.save(update_fields=['status', 'error_message'])
+        if not _set_document_status(doc, Document.Status.INDEXING, error_message=None):
+            raise DocumentDeleting()
 
-        index_document(doc)
+        result = index_document(doc, progress=report, usage=usage)
+        if result.get('deleting'):
+            raise DocumentDeleting()
 
         job.status = IndexJob.Status.DONE
         job.finished_at = timezone.now()
-        job.save(update_fields=['status', 'finished_at'])
+        _save_job(job, ['status', 'finished_at'])
+        progress.publish(job.celery_task_id, _progress_payload(job, started))
 
-        doc.status = Document.Status.INDEXED
-        doc.save(update_fields=['status'])
+        _set_document_status(doc, Document.Status.INDEXED)
     except Exception as exc:
         job.status = IndexJob.Status.FAILED
         job.error_message = str(exc)
         job.finished_at = timezone.now()
-        job.save(update_fields=['status', 'error_message', 'finished_at'])
+        # Tokens spent before the failure are still billed.
+        job.embedding_tokens = usage['embedding_tokens']
+        job.cost_usd = usage['cost_usd']
+        _save_job(job, ['status', 'error_message', 'finished_at', 'embedding_tokens', 'cost_usd'])
+        progress.publish(job.celery_task_id, _progress_payload(job, started))
 
-        doc.status = Document.Status.FAILED
-        doc.error_message = str(exc)
-        doc.save(update_fields=['status', 'error_message'])
+        if isinstance(exc, DocumentDeleting):
+            # Expected race with a delete; the delete task owns the document from here.
+            return job.id
+        _set_document_status(doc, Document.Status.FAILED, error_message=str(exc))
         raise
 
     return job.id
+
+
+@shared_task
+def delete_document_task(document_id):
+    from .rag_core import delete_document
+
+    doc = Document.objects.filter(pk=document_id).first()
+    if doc is None:
+        # Already deleted by an earlier (retried or duplicated) delivery.
+        return 0
+    return delete_document(doc)
+
+
+@shared_task
+def delete_collection_task(collection):
+    from .rag_core import delete_document
+
+    # Claim everything first, a batch per UPDATE, so the whole collection leaves search quickly.
+    claimed = []
+    remaining = Document.objects.filter(collection=collection).exclude(status=Document.Status.DELETING)
+    while True:
+        batch = list(remaining.order_by('id').values_list('id', flat=True)[:settings.DOCS_BULK_DELETE_MAX])
+        if not batch:
+            break
+        Document.objects.filter(id__in=batch).exclude(status=Document.Status.DELETING).update(
+            status=Document.Status.DELETING, updated_at=timezone.now(),
+        )
+        claimed.extend(batch)
+
+    deleted = 0
+    for start in range(0, len(claimed), settings.DOCS_BULK_DELETE_MAX):
+        for doc in Document.objects.filter(id__in=claimed[start:start + settings.DOCS_BULK_DELETE_MAX]):
+            deleted += delete_document(doc)
+    return deleted
+
+
+@shared_task
+def chunk_maintenance_task(force=False):
+    from .services import maintenance
+
+    return maintenance.run(force=force)
+
+
+@shared_task
+def reembed_task(migration_id):
+    from .services import reembed
+
+    migration = EmbeddingMigration.objects.get(pk=migration_id)
+    migration.celery_task_id = current_task.request.id
+    migration.save(update_fields=['celery_task_id'])
+    # Resumes from the stored checkpoints, so re-enqueueing after a crash or pause is safe.
+    return reembed.run(migration).status
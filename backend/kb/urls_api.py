@@ -1,13 +1,37 @@
 ﻿from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 
-from .views_api import AskView, DocumentDetailView, DocumentIndexView, DocumentListCreateView, IndexJobDetailView
+from .views_api import (
+    AskBatchView,
+    AskView,
+    ChunkLookupView,
+    DocumentBulkDeleteView,
+    DocumentDetailView,
+    DocumentIndexView,
+    DocumentListCreateView,
+    EmbeddingStatusView,
+    IndexJobDetailView,
+    IndexJobEventsView,
+    QueueStatusView,
+    ReplicaStatusView,
+    StartupReportView,
+    UsageMetricsView,
+)
 
 urlpatterns = [
     path('token/', obtain_auth_token, name='api_token'),
     path('docs/', DocumentListCreateView.as_view(), name='api_docs'),
+    path('docs/delete/', DocumentBulkDeleteView.as_view(), name='api_docs_delete'),
     path('docs/<int:pk>/', DocumentDetailView.as_view(), name='api_doc_detail'),
     path('docs/<int:pk>/index/', DocumentIndexView.as_view(), name='api_doc_index'),
     path('jobs/<str:job_id>/', IndexJobDetailView.as_view(), name='api_job_detail'),
+    path('jobs/<str:job_id>/events/', IndexJobEventsView.as_view(), name='api_job_events'),
     path('ask/', AskView.as_view(), name='api_ask'),
+    path('ask/batch/', AskBatchView.as_view(), name='api_ask_batch'),
+    path('chunks/', ChunkLookupView.as_view(), name='api_chunks'),
+    path('queues/', QueueStatusView.as_view(), name='api_queues'),
+    path('embeddings/', EmbeddingStatusView.as_view(), name='api_embeddings'),
+    path('usage/', UsageMetricsView.as_view(), name='api_usage'),
+    path('startup/', StartupReportView.as_view(), name='api_startup'),
+    path('replicas/', ReplicaStatusView.as_view(), name='api_replicas'),
 ]
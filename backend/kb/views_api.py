@@ -1,16 +1,35 @@
-﻿from django.conf import settings
+﻿import base64
+import hashlib
+import json
+from datetime import datetime
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag, urlencode
+from django.views.decorators.gzip import gzip_page
 from django_ratelimit.decorators import ratelimit
 from rest_framework import status
 from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Document, IndexJob
+from .authentication import JobEventsTokenAuthentication, job_events_token
+from .models import DEFAULT_COLLECTION, Document, IndexJob, validate_collection
+from .routers import replica_reads, replica_status
 from .serializers import DocumentCreateSerializer, DocumentSerializer, IndexJobSerializer
-from .services import parsers, vector_store
-from .tasks import index_document_task
+from .services import progress, queues, uploads
+from .tasks import delete_collection_task, delete_document_task, index_document_task
 
 
 def _parse_bool(value) -> bool:
@@ -40,13 +59,95 @@ def _parse_doc_ids(value):
     return None
 
 
+def _parse_collection(value):
+    if value is None or value == '':
+        return DEFAULT_COLLECTION
+    value = str(value).strip()
+    try:
+        validate_collection(value)
+    except ValidationError:
+        return None
+    return value
+
+
+def _encode_cursor(doc: Document) -> str:
+    raw = f"{doc.created_at.isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(value: str):
+    try:
+        raw = base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8')
+        created_at, doc_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+@method_decorator(gzip_page, name='dispatch')
 class DocumentListCreateView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
+    @replica_reads()
     def get(self, request):
-        docs = Document.objects.order_by('-created_at')
-        serializer = DocumentSerializer(docs, many=True, context={'request': request})
-        return Response(serializer.data)
+        docs = Document.objects.all()
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            if status_filter not in Document.Status.values:
+                return Response({'detail': 'status is not valid'}, status=status.HTTP_400_BAD_REQUEST)
+            docs = docs.filter(status=status_filter)
+        else:
+            docs = docs.exclude(status=Document.Status.DELETING)
+        collection_filter = request.query_params.get('collection')
+        if collection_filter:
+            docs = docs.filter(collection=collection_filter)
+        title_filter = request.query_params.get('title', '').strip()
+        if title_filter:
+            docs = docs.filter(title__istartswith=title_filter)
+
+        # Unchanged polls skip serialization; without a title filter the (collection,) status, updated_at
+        # indexes answer this as an index-only scan instead of reading the wide document rows.
+        stats = docs.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        last_modified = stats['last_modified']
+        etag_source = f"{request.get_full_path()}|{stats['count']}|{last_modified.isoformat() if last_modified else ''}"
+        etag = hashlib.sha256(etag_source.encode('utf-8')).hexdigest()[:32]
+        # No Last-Modified: deletes never raise Max(updated_at) and HTTP dates only resolve to the second,
+        # so only the count-and-microsecond ETag can tell a changed listing apart.
+        not_modified = get_conditional_response(request, etag=quote_etag(etag))
+        if not_modified is not None:
+            return not_modified
+
+        docs = docs.order_by('-created_at', '-id')
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
+        if cursor is None and limit is None:
+            serializer = DocumentSerializer(docs, many=True, context={'request': request})
+            response = Response(serializer.data)
+        else:
+            try:
+                limit = min(int(limit or settings.DOCS_PAGE_SIZE), settings.DOCS_PAGE_SIZE_MAX)
+            except ValueError:
+                return Response({'detail': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if limit <= 0:
+                return Response({'detail': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+            if cursor:
+                position = _decode_cursor(cursor)
+                if position is None:
+                    return Response({'detail': 'cursor is not valid'}, status=status.HTTP_400_BAD_REQUEST)
+                created_at, doc_id = position
+                docs = docs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=doc_id))
+            page = list(docs[:limit + 1])
+            next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+            serializer = DocumentSerializer(page[:limit], many=True, context={'request': request})
+            response = Response({
+                'results': serializer.data,
+                'next_cursor': next_cursor,
+                'count': stats['count'],
+            })
+
+        response['ETag'] = quote_etag(etag)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     def post(self, request):
         title = request.data.get('title', '').strip()
@@ -54,28 +155,51 @@ class DocumentListCreateView(APIView):
         if not title or not file_obj:
             return Response({'detail': 'title and file are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        from .rag_core import find_canonical_document
+
         if settings.STORE_UPLOADS_ON_DISK:
             serializer = DocumentCreateSerializer(data=request.data)
             if serializer.is_valid():
-                doc = serializer.save(original_filename=file_obj.name)
+                content_hash = uploads.hash_upload(file_obj)
+                collection = serializer.validated_data.get('collection', DEFAULT_COLLECTION)
+                doc = serializer.save(
+                    original_filename=file_obj.name,
+                    content_hash=content_hash,
+                    duplicate_of=find_canonical_document(content_hash, collection),
+                )
                 output = DocumentSerializer(doc, context={'request': request}).data
                 return Response(output, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        collection = _parse_collection(request.data.get('collection'))
+        if collection is None:
+            return Response({'detail': 'collection is not valid'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Spool to shared temp storage; the index worker parses it later.
         try:
-            raw_text = parsers.load_text_from_file(file_obj, file_obj.name)
+            spool_path, content_hash = uploads.spool_upload(file_obj, file_obj.name)
         except ValueError as exc:
             return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
+        canonical = find_canonical_document(content_hash, collection)
+        if canonical is not None:
+            # Identical content reuses the canonical document's chunks; no need to parse it again.
+            uploads.discard_spool(spool_path)
+            spool_path = None
+
         doc = Document.objects.create(
             title=title,
+            collection=collection,
             original_filename=file_obj.name,
-            raw_text=raw_text,
+            spool_path=spool_path,
+            content_hash=content_hash,
+            duplicate_of=canonical,
         )
         output = DocumentSerializer(doc, context={'request': request}).data
         return Response(output, status=status.HTTP_201_CREATED)
 
 
+@method_decorator(gzip_page, name='dispatch')
 class DocumentDetailView(APIView):
     def get(self, request, pk):
         doc = get_object_or_404(Document, pk=pk)
@@ -84,63 +208,378 @@ class DocumentDetailView(APIView):
 
     def delete(self, request, pk):
         doc = get_object_or_404(Document, pk=pk)
-        chunk_ids = list(doc.chunks.values_list('vector_id', flat=True))
-        try:
-            if chunk_ids:
-                vector_store.delete_chunks(chunk_ids)
-        except Exception:
+        job_ids = _enqueue_deletes([doc.pk])
+        return Response(
+            {'id': doc.pk, 'status': Document.Status.DELETING, 'job_id': job_ids[0] if job_ids else None},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+def _enqueue_deletes(doc_ids: list[int]) -> list[str]:
+    # The status flip hides documents from listings and search at once; chunks go in the background.
+    claimed = list(
+        Document.objects.filter(id__in=doc_ids).exclude(status=Document.Status.DELETING).values_list('id', flat=True)
+    )
+    Document.objects.filter(id__in=claimed).update(status=Document.Status.DELETING, updated_at=timezone.now())
+    return [delete_document_task.delay(doc_id).id for doc_id in claimed]
+
+
+class DocumentBulkDeleteView(APIView):
+    def post(self, request):
+        doc_ids = _parse_doc_ids(request.data.get('ids'))
+        collection = request.data.get('collection')
+        if doc_ids is None and not collection:
+            return Response({'detail': 'ids or collection is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if collection and _parse_collection(collection) is None:
+            return Response({'detail': 'collection is not valid'}, status=status.HTTP_400_BAD_REQUEST)
+        if doc_ids is None:
+            # A whole collection is unbounded: one task claims and deletes it in batches off the request.
+            async_result = delete_collection_task.delay(collection)
+            return Response(
+                {'collection': collection, 'status': Document.Status.DELETING, 'job_id': async_result.id},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        docs = Document.objects.all()
+        if len(doc_ids) > settings.DOCS_BULK_DELETE_MAX:
             return Response(
-                {'detail': 'Failed to delete document from vector store.'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {'detail': f"at most {settings.DOCS_BULK_DELETE_MAX} ids per request"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        if doc.file:
-            doc.file.delete(save=False)
-        doc.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        docs = docs.filter(id__in=doc_ids)
+        if collection:
+            docs = docs.filter(collection=collection)
+        matched = list(docs.order_by('id').values_list('id', flat=True))
+        job_ids = _enqueue_deletes(matched)
+        return Response({'matched': len(matched), 'queued': len(job_ids)}, status=status.HTTP_202_ACCEPTED)
 
 
 class DocumentIndexView(APIView):
     def post(self, request, pk):
         doc = get_object_or_404(Document, pk=pk)
+        if doc.status == Document.Status.DELETING:
+            return Response({'detail': 'Document is being deleted.'}, status=status.HTTP_409_CONFLICT)
         if not settings.ENABLE_REINDEX and doc.status == Document.Status.INDEXED:
             return Response({'detail': 'Reindexing is disabled.'}, status=status.HTTP_400_BAD_REQUEST)
-        if not doc.raw_text and not doc.file:
+        has_source = doc.raw_text or doc.source_compressed or doc.file or doc.spool_path
+        if not has_source and not doc.duplicate_of_id:
             return Response({'detail': 'No source text available for indexing.'}, status=status.HTTP_400_BAD_REQUEST)
-        async_result = index_document_task.delay(doc.id)
-        return Response({'job_id': async_result.id, 'status': 'PENDING'})
+        route = queues.route_for(doc, bulk=_parse_bool(request.data.get('bulk')))
+        async_result = index_document_task.apply_async((doc.id,), **route)
+        return Response({
+            'job_id': async_result.id,
+            'status': 'PENDING',
+            'queue': route['queue'],
+            'events_url': _job_events_url(request, async_result.id),
+        })
+
+
+def _find_job(job_id: str):
+    lookup = Q(celery_task_id=job_id)
+    if job_id.isdigit():
+        lookup |= Q(pk=int(job_id))
+    # Prefer the Celery task id match when a numeric id collides with a pk.
+    jobs = list(IndexJob.objects.filter(lookup)[:2])
+    for job in jobs:
+        if job.celery_task_id == job_id:
+            return job
+    return jobs[0] if jobs else None
 
 
 class IndexJobDetailView(APIView):
     def get(self, request, job_id):
-        job = IndexJob.objects.filter(celery_task_id=job_id).first()
-        if not job and job_id.isdigit():
-            job = IndexJob.objects.filter(pk=int(job_id)).first()
+        job = _find_job(job_id)
         if not job:
             return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
         serializer = IndexJobSerializer(job)
         return Response(serializer.data)
 
 
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode('utf-8')
+
+
+def _sse_events(task_id: str):
+    yield 'retry: 2000\n\n'
+    for payload in progress.listen(task_id, settings.INDEX_PROGRESS_STREAM_TIMEOUT):
+        if payload is None:
+            yield ': keepalive\n\n'
+            continue
+        yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+
+
+def _job_events_url(request, task_id: str) -> str:
+    url = reverse('api_job_events', args=[task_id])
+    return f"{url}?{urlencode({'token': job_events_token(request.user, task_id)})}"
+
+
+class IndexJobEventsView(APIView):
+    authentication_classes = (JobEventsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    def get(self, request, job_id):
+        job = _find_job(job_id)
+        if job and job.celery_task_id:
+            task_id = job.celery_task_id
+        elif not job and not job_id.isdigit():
+            # The task may be queued but not started yet; subscribe by task id.
+            task_id = job_id
+        else:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if isinstance(request.auth, dict) and request.auth.get('task') != task_id:
+            # A stream token only opens the job it was issued for.
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(_sse_events(task_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+def _parse_ask_options(data):
+    # Returns (options, error_detail) for the retrieval knobs shared by the ask endpoints.
+    try:
+        top_k = int(data.get('top_k') or 0) or None
+    except (TypeError, ValueError):
+        return None, 'top_k must be an integer'
+    if top_k is not None and top_k <= 0:
+        return None, 'top_k must be positive'
+
+    doc_ids = _parse_doc_ids(data.get('doc_ids'))
+    if data.get('doc_ids') is not None and doc_ids is None:
+        return None, 'doc_ids must be a list of integers'
+
+    mmr = None
+    if data.get('mmr') is not None:
+        mmr = _parse_bool(data.get('mmr'))
+    try:
+        mmr_lambda = data.get('mmr_lambda')
+        mmr_lambda = float(mmr_lambda) if mmr_lambda not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, 'mmr_lambda must be a number'
+    if mmr_lambda is not None and not 0 <= mmr_lambda <= 1:
+        return None, 'mmr_lambda must be between 0 and 1'
+    try:
+        fetch_k = int(data.get('fetch_k') or 0) or None
+    except (TypeError, ValueError):
+        return None, 'fetch_k must be an integer'
+    if fetch_k is not None and fetch_k <= 0:
+        return None, 'fetch_k must be positive'
+    collection = _parse_collection(data.get('collection'))
+    if collection is None:
+        return None, 'collection is not valid'
+    try:
+        max_distance = data.get('max_distance')
+        max_distance = float(max_distance) if max_distance not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, 'max_distance must be a number'
+    if max_distance is not None and not 0 <= max_distance <= 2:
+        return None, 'max_distance must be between 0 and 2'
+    try:
+        max_prompt_tokens = int(data.get('max_prompt_tokens') or 0) or None
+    except (TypeError, ValueError):
+        return None, 'max_prompt_tokens must be an integer'
+    if max_prompt_tokens is not None and max_prompt_tokens <= 0:
+        return None, 'max_prompt_tokens must be positive'
+    try:
+        route_docs = data.get('route_docs')
+        route_docs = int(route_docs) if route_docs not in (None, '') else None
+    except (TypeError, ValueError):
+        return None, 'route_docs must be an integer'
+    if route_docs is not None and route_docs < 0:
+        return None, 'route_docs must not be negative'
+
+    return {
+        'top_k': top_k,
+        'doc_ids': doc_ids,
+        'explain': _parse_bool(data.get('explain')),
+        'mmr': mmr,
+        'mmr_lambda': mmr_lambda,
+        'fetch_k': fetch_k,
+        'collection': collection,
+        'max_distance': max_distance,
+        'max_prompt_tokens': max_prompt_tokens,
+        'route_docs': route_docs,
+    }, None
+
+
+SOURCE_MODES = ('full', 'snippet', 'ids')
+
+
+def _parse_source_options(data):
+    # How much of each source's text to send back; the rest can be fetched from the chunks endpoint.
+    mode = str(data.get('sources') or settings.ASK_SOURCES_MODE).strip().lower()
+    if mode not in SOURCE_MODES:
+        return None, f"sources must be one of {', '.join(SOURCE_MODES)}"
+    try:
+        snippet_chars = int(data.get('snippet_chars') or 0) or settings.ASK_SNIPPET_CHARS
+    except (TypeError, ValueError):
+        return None, 'snippet_chars must be an integer'
+    if snippet_chars <= 0:
+        return None, 'snippet_chars must be positive'
+    return {'mode': mode, 'snippet_chars': snippet_chars}, None
+
+
+def _snippet(text: str, limit: int) -> str:
+    cut = text[:limit]
+    # End on a word boundary unless that would throw away most of the snippet.
+    space = cut.rfind(' ')
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + '\u2026'
+
+
+def _shape_sources(result: dict, shape: dict) -> dict:
+    if shape['mode'] == 'full' or not result.get('sources'):
+        return result
+    sources = []
+    for source in result['sources']:
+        text = source.get('text') or ''
+        source = {key: value for key, value in source.items() if key != 'text'}
+        if shape['mode'] == 'snippet':
+            source['truncated'] = len(text) > shape['snippet_chars']
+            source['text'] = _snippet(text, shape['snippet_chars']) if source['truncated'] else text
+        sources.append(source)
+    return {**result, 'sources': sources}
+
+
+@method_decorator(gzip_page, name='dispatch')
 class AskView(APIView):
     @method_decorator(ratelimit(key='user', rate='60/m', block=True))
     def post(self, request):
         question = request.data.get('question', '').strip()
         if not question:
             return Response({'detail': 'question is required'}, status=status.HTTP_400_BAD_REQUEST)
+        options, error = _parse_ask_options(request.data)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+        shape, error = _parse_source_options(request.data)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        from .rag_core import PromptBudgetExceeded, answer_question
+
+        try:
+            result = answer_question(question, **options)
+        except PromptBudgetExceeded as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(_shape_sources(result, shape))
+
+
+@method_decorator(gzip_page, name='dispatch')
+class AskBatchView(APIView):
+    @method_decorator(ratelimit(key='user', rate=settings.ASK_BATCH_RATE, block=True))
+    def post(self, request):
+        questions = request.data.get('questions')
+        if not isinstance(questions, list) or not questions:
+            return Response({'detail': 'questions must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(questions) > settings.ASK_BATCH_MAX_QUESTIONS:
+            return Response(
+                {'detail': f"at most {settings.ASK_BATCH_MAX_QUESTIONS} questions per batch"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        questions = [str(question).strip() for question in questions]
+        if not all(questions):
+            return Response({'detail': 'questions must not be blank'}, status=status.HTTP_400_BAD_REQUEST)
+        options, error = _parse_ask_options(request.data)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+        shape, error = _parse_source_options(request.data)
+        if error:
+            return Response({'detail': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        from .rag_core import answer_questions
+
+        results = answer_questions(questions, **options)
+        return Response({'results': [_shape_sources(result, shape) for result in results]})
+
+
+def _parse_chunk_refs(value):
+    # "doc_id:chunk_index" pairs, comma separated, as returned in ask sources.
+    refs = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        doc_id, sep, chunk_index = part.partition(':')
+        try:
+            refs.append((int(doc_id), int(chunk_index)))
+        except ValueError:
+            return None
+        if not sep:
+            return None
+    return refs
+
+
+@method_decorator(gzip_page, name='dispatch')
+class ChunkLookupView(APIView):
+    def get(self, request):
+        refs = _parse_chunk_refs(request.query_params.get('refs'))
+        if not refs:
+            return Response(
+                {'detail': 'refs must be a comma separated list of doc_id:chunk_index'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(refs) > settings.CHUNK_LOOKUP_MAX_REFS:
+            return Response(
+                {'detail': f"at most {settings.CHUNK_LOOKUP_MAX_REFS} refs per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        from .rag_core import lookup_chunks
+
+        return Response({'chunks': lookup_chunks(refs)})
+
+
+class UsageMetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
         try:
-            top_k = int(request.data.get('top_k') or 0) or None
+            days = int(request.query_params.get('days') or 7)
         except ValueError:
-            return Response({'detail': 'top_k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= 90:
+            return Response({'detail': 'days must be between 1 and 90'}, status=status.HTTP_400_BAD_REQUEST)
+        from .services import usage
+
+        return Response({'days': usage.daily_metrics(days)})
 
-        if top_k is not None and top_k <= 0:
-            return Response({'detail': 'top_k must be positive'}, status=status.HTTP_400_BAD_REQUEST)
 
-        from .rag_core import answer_question
+class StartupReportView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        from .warmup import report
+
+        return Response(report())
 
-        explain = _parse_bool(request.data.get('explain'))
-        doc_ids = _parse_doc_ids(request.data.get('doc_ids'))
-        if request.data.get('doc_ids') is not None and doc_ids is None:
-            return Response({'detail': 'doc_ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
 
-        result = answer_question(question, top_k=top_k, doc_ids=doc_ids, explain=explain)
-        return Response(result)
+class EmbeddingStatusView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        from .services import reembed
+
+        return Response(reembed.report())
+
+
+class QueueStatusView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        try:
+            hints = queues.autoscale_hints()
+        except redis.RedisError:
+            return Response({'detail': 'queue broker is unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'queues': hints})
+
+
+class ReplicaStatusView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({'replicas': replica_status(refresh=True)})
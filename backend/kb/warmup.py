@@ -0,0 +1,167 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.monotonic()
+_HNSW_INDEXES_SQL = (
+    "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexdef ILIKE '%%USING hnsw%%'"
+)
+
+_report = {'role': None, 'warmup': None, 'first_request': None}
+_report_lock = threading.Lock()
+
+
+def _step(steps: list, name: str, func) -> None:
+    start = time.perf_counter()
+    try:
+        detail = func()
+    except Exception as exc:
+        logger.warning('Warm-up step %s failed', name, exc_info=True)
+        detail = f"failed: {exc}"
+    steps.append({
+        'name': name,
+        'ms': round((time.perf_counter() - start) * 1000, 2),
+        'detail': detail or '',
+    })
+
+
+def _check_databases() -> str:
+    # Connections are per thread: a Celery child runs its tasks on this thread and keeps them, while
+    # web requests run on other threads, so there this only proves each database answers (DNS, TLS, auth).
+    aliases = [
+        alias for alias in settings.DATABASES
+        if alias == 'default' or alias.startswith(('replica_', 'shard_'))
+    ]
+    for alias in aliases:
+        connections[alias].ensure_connection()
+    return ','.join(aliases)
+
+
+def _open_provider() -> str:
+    from .services import llm_client
+
+    client = llm_client.get_client()
+    if not settings.WARMUP_PROVIDER_PING:
+        return 'client built'
+    # A metadata call completes the TLS handshake so the pool holds a live connection.
+    client.models.retrieve(settings.EMBED_MODEL)
+    return f"pinged {settings.EMBED_MODEL}"
+
+
+def _probe_vector() -> list[float]:
+    from .models import Chunk
+
+    dims = Chunk._meta.get_field('embedding').dimensions
+    return [1.0] + [0.0] * (dims - 1)
+
+
+def _prewarm_vector_index() -> str:
+    from .models import Chunk
+    from .services import shards, vector_store
+
+    if not settings.VECTOR_SNAPSHOT_PATH and not vector_store.uses_pgvector():
+        return 'skipped (no vector backend)'
+    if not settings.VECTOR_SNAPSHOT_PATH:
+        try:
+            warmed = 0
+            for alias in shards.write_aliases():
+                with transaction.atomic(using=alias):
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute(_HNSW_INDEXES_SQL, [Chunk._meta.db_table])
+                        indexes = [row[0] for row in cursor.fetchall()]
+                        for index in indexes:
+                            cursor.execute('SELECT pg_prewarm(%s)', [index])
+                warmed += len(indexes)
+            return f"pg_prewarm {warmed} indexes"
+        except DatabaseError:
+            logger.info('pg_prewarm is unavailable; warming the index with a probe search')
+    # A throwaway search faults in the graph entry pages (or the snapshot memmap).
+    vector_store.query(_probe_vector(), 1)
+    return 'probe search'
+
+
+def _prime_caches() -> str:
+    from .routers import replica_aliases, replica_status
+
+    # The views import rag_core lazily, so the first /ask would otherwise pay for it.
+    importlib.import_module(f"{__package__}.rag_core")
+
+    if replica_aliases():
+        replica_status(refresh=True)
+    return 'rag_core, replica status'
+
+
+def warm_up(role: str, prewarm_index: bool = True) -> dict:
+    steps = []
+    total_start = time.perf_counter()
+    _step(steps, 'Databases', _check_databases)
+    _step(steps, 'LLM provider', _open_provider)
+    if prewarm_index:
+        _step(steps, 'Vector index', _prewarm_vector_index)
+    _step(steps, 'Caches', _prime_caches)
+    warmup = {
+        'steps': steps,
+        'total_ms': round((time.perf_counter() - total_start) * 1000, 2),
+        'ready_after_ms': round((time.monotonic() - PROCESS_STARTED) * 1000, 2),
+    }
+    with _report_lock:
+        _report['role'] = role
+        _report['warmup'] = warmup
+    logger.info('Warm-up (%s) finished in %sms: %s', role, warmup['total_ms'], steps)
+    return warmup
+
+
+def _is_web_process() -> bool:
+    command = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if 'celery' in command:
+        # Workers warm up per child in worker_process_init.
+        return False
+    if command in {'manage.py', 'django-admin'}:
+        # Only the reloaded child of runserver serves requests.
+        return sys.argv[1:2] == ['runserver'] and os.environ.get('RUN_MAIN') == 'true'
+    return True
+
+
+def start_web_warm_up() -> None:
+    if not settings.WARMUP_ON_STARTUP or not _is_web_process():
+        return
+
+    def run():
+        from django.apps import apps
+
+        # ready() hooks must not query the database; wait for the registry to finish loading.
+        while not apps.ready:
+            time.sleep(0.01)
+        try:
+            warm_up('web')
+        finally:
+            # Nothing else runs on this thread, so its connections would otherwise sit idle until the server drops them.
+            connections.close_all()
+
+    threading.Thread(target=run, name='kb-warmup', daemon=True).start()
+
+
+def record_first_request(path: str, duration_ms: float) -> bool:
+    with _report_lock:
+        if _report['first_request'] is not None:
+            return False
+        _report['first_request'] = {
+            'path': path,
+            'ms': round(duration_ms, 2),
+            'after_start_ms': round((time.monotonic() - PROCESS_STARTED) * 1000, 2),
+        }
+    logger.info('First request in process %s: %s took %.2fms', os.getpid(), path, duration_ms)
+    return True
+
+
+def report() -> dict:
+    with _report_lock:
+        return {**_report, 'pid': os.getpid(), 'uptime_s': round(time.monotonic() - PROCESS_STARTED, 2)}
@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'kb.middleware.FirstRequestTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'rag_kb.urls'
@@ -67,6 +68,21 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=False),
     }
+    # Read replicas serve opted-in retrieval and listing reads (see kb.routers).
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    # A dead replica must fail its lag probe quickly instead of waiting out the OS TCP timeout.
+    REPLICA_CONNECT_TIMEOUT = int(os.getenv('REPLICA_CONNECT_TIMEOUT', 2))
+    for replica_number, replica_url in enumerate(DATABASE_REPLICA_URLS):
+        replica_db = dj_database_url.parse(replica_url, conn_max_age=600, ssl_require=False)
+        replica_db.setdefault('OPTIONS', {}).setdefault('connect_timeout', REPLICA_CONNECT_TIMEOUT)
+        DATABASES[f'replica_{replica_number}'] = {
+            **replica_db,
+            'TEST': {'MIRROR': 'default'},
+        }
+    # Vector shards hold chunk rows for the documents assigned to them (see kb.services.shards).
+    VECTOR_SHARD_URLS = [url.strip() for url in os.getenv('VECTOR_SHARD_URLS', '').split(',') if url.strip()]
+    for shard_number, shard_url in enumerate(VECTOR_SHARD_URLS):
+        DATABASES[f'shard_{shard_number}'] = dj_database_url.parse(shard_url, conn_max_age=600, ssl_require=False)
 else:
     SQLITE_PATH = os.getenv('SQLITE_PATH')
     if SQLITE_PATH:
@@ -80,6 +96,11 @@ else:
         }
     }
 
+DATABASE_ROUTERS = ['kb.routers.ReplicaRouter']
+REPLICA_SELECTION = os.getenv('REPLICA_SELECTION', 'round_robin')
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 10))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,6 +135,15 @@ LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', 20 * 1024 * 1024))
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 2 * 1024 * 1024))
+UPLOAD_STREAM_CHUNK_SIZE = int(os.getenv('UPLOAD_STREAM_CHUNK_SIZE', 256 * 1024))
+UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(MEDIA_ROOT, 'spool'))
+# Compressed extracted text keyed by file hash and parser version; LRU-evicted past the cap (0 disables).
+EXTRACTION_CACHE_DIR = os.getenv('EXTRACTION_CACHE_DIR', os.path.join(MEDIA_ROOT, 'extraction-cache'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+DOCS_PAGE_SIZE = int(os.getenv('DOCS_PAGE_SIZE', 50))
+DOCS_PAGE_SIZE_MAX = int(os.getenv('DOCS_PAGE_SIZE_MAX', 500))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -122,28 +152,135 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'kb.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
 CHAT_MODEL = os.getenv('CHAT_MODEL', 'gpt-4o-mini')
 EMBED_MODEL = os.getenv('EMBED_MODEL', 'text-embedding-3-small')
+# Background re-embedding (manage.py reembed) budget; 0 disables a limit.
+REEMBED_BATCH_SIZE = int(os.getenv('REEMBED_BATCH_SIZE', 256))
+REEMBED_TOKENS_PER_MINUTE = int(os.getenv('REEMBED_TOKENS_PER_MINUTE', 500000))
+REEMBED_REQUESTS_PER_MINUTE = int(os.getenv('REEMBED_REQUESTS_PER_MINUTE', 500))
+# Seconds a process trusts its cached live embedding model for questions (indexing always re-reads it).
+EMBED_MODEL_CACHE_TTL = int(os.getenv('EMBED_MODEL_CACHE_TTL', 10))
+# Chunks whose vectors move per UPDATE statement inside the "reembed switch" transaction.
+REEMBED_SWAP_BATCH_SIZE = int(os.getenv('REEMBED_SWAP_BATCH_SIZE', 5000))
 
 STORE_UPLOADS_ON_DISK = os.getenv('STORE_UPLOADS_ON_DISK', '1') == '1'
 ENABLE_REINDEX = os.getenv('ENABLE_REINDEX', '1') == '1'
 DISCARD_RAW_TEXT_AFTER_INDEX = os.getenv('DISCARD_RAW_TEXT_AFTER_INDEX', '0') == '1'
+DEDUPE_UPLOADS = os.getenv('DEDUPE_UPLOADS', '1') == '1'
 
 CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', 900))
 CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 150))
+# 'text' stores a copy per chunk; 'spans' stores (start, end) offsets into one per-document source.
+CHUNK_STORAGE = os.getenv('CHUNK_STORAGE', 'text')
+SOURCE_COMPRESSION = os.getenv('SOURCE_COMPRESSION', '0') == '1'
+SOURCE_COMPRESSION_LEVEL = int(os.getenv('SOURCE_COMPRESSION_LEVEL', 6))
 TOP_K_DEFAULT = int(os.getenv('TOP_K_DEFAULT', 6))
+# Cosine distance above which a hit is dropped before generation; empty disables the gate.
+RELEVANCE_MAX_DISTANCE = float(os.getenv('RELEVANCE_MAX_DISTANCE')) if os.getenv('RELEVANCE_MAX_DISTANCE') else None
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv('ASK_BATCH_MAX_QUESTIONS', 50))
+ASK_BATCH_CONCURRENCY = int(os.getenv('ASK_BATCH_CONCURRENCY', 4))
+ASK_BATCH_RATE = os.getenv('ASK_BATCH_RATE', '10/m')
+# Estimated prompt tokens allowed per LLM call (0 disables); 'trim' drops the weakest context, 'reject' fails.
+ASK_MAX_PROMPT_TOKENS = int(os.getenv('ASK_MAX_PROMPT_TOKENS', 0))
+ASK_PROMPT_BUDGET_MODE = os.getenv('ASK_PROMPT_BUDGET_MODE', 'trim')
+# Default source payload for /ask: 'full' text, a 'snippet' of ASK_SNIPPET_CHARS, or 'ids' only.
+ASK_SOURCES_MODE = os.getenv('ASK_SOURCES_MODE', 'full')
+ASK_SNIPPET_CHARS = int(os.getenv('ASK_SNIPPET_CHARS', 300))
+CHUNK_LOOKUP_MAX_REFS = int(os.getenv('CHUNK_LOOKUP_MAX_REFS', 100))
+# USD per million tokens, used for cost estimates in traces, index jobs and usage metrics.
+EMBED_COST_PER_1M_TOKENS = float(os.getenv('EMBED_COST_PER_1M_TOKENS', 0.02))
+CHAT_INPUT_COST_PER_1M_TOKENS = float(os.getenv('CHAT_INPUT_COST_PER_1M_TOKENS', 0.15))
+CHAT_OUTPUT_COST_PER_1M_TOKENS = float(os.getenv('CHAT_OUTPUT_COST_PER_1M_TOKENS', 0.60))
+# Seconds usage counters wait on Redis before giving up (the call is then logged and skipped).
+USAGE_REDIS_TIMEOUT = float(os.getenv('USAGE_REDIS_TIMEOUT', 0.5))
+MMR_ENABLED = os.getenv('MMR_ENABLED', '0') == '1'
+MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', 0.5))
+MMR_FETCH_K = int(os.getenv('MMR_FETCH_K', 24))
+
+# hnsw.ef_search starts here and doubles (up to the max) while a doc filter leaves fewer than top_k hits.
+VECTOR_EF_SEARCH = int(os.getenv('VECTOR_EF_SEARCH', 40))
+VECTOR_EF_SEARCH_MAX = int(os.getenv('VECTOR_EF_SEARCH_MAX', 1000))
+# pgvector >= 0.8 only: '', 'strict_order' or 'relaxed_order'.
+VECTOR_ITERATIVE_SCAN = os.getenv('VECTOR_ITERATIVE_SCAN', '')
+# Serve vector search from a memory-mapped snapshot directory (see export_snapshot) instead of the DB.
+VECTOR_SNAPSHOT_PATH = os.getenv('VECTOR_SNAPSHOT_PATH', '')
+# Scatter-gather threads across vector shards (0 = one per shard plus the primary).
+VECTOR_SHARD_PARALLELISM = int(os.getenv('VECTOR_SHARD_PARALLELISM', 0))
+# How long a search trusts its "are unsharded chunks left on the primary" check.
+VECTOR_SHARD_MAP_TTL = int(os.getenv('VECTOR_SHARD_MAP_TTL', 30))
+# Two-stage retrieval: chunk search only inside the N documents nearest by centroid embedding (0 disables).
+DOC_ROUTING_TOP_N = int(os.getenv('DOC_ROUTING_TOP_N', 0))
+
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', '1') == '1'
+WARMUP_PROVIDER_PING = os.getenv('WARMUP_PROVIDER_PING', '1') == '1'
 
 REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+# Seconds before a service Redis call (progress, queue depths, maintenance baselines) gives up.
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2))
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL)
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', REDIS_URL)
 CELERY_WORKER_CONCURRENCY = int(os.getenv('CELERY_WORKER_CONCURRENCY', '1'))
 CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
 CELERY_WORKER_MAX_TASKS_PER_CHILD = int(os.getenv('CELERY_WORKER_MAX_TASKS_PER_CHILD', '50'))
 
+# Indexing is split by estimated cost so one huge PDF cannot block small uploads.
+INDEX_QUEUE_SMALL = os.getenv('INDEX_QUEUE_SMALL', 'index_small')
+INDEX_QUEUE_LARGE = os.getenv('INDEX_QUEUE_LARGE', 'index_large')
+# Chunk deletes and vacuum/reindex get their own queue (and worker) so they never delay large-document indexing.
+MAINTENANCE_QUEUE = os.getenv('MAINTENANCE_QUEUE', 'maintenance')
+# Re-embedding runs for hours, so it has a queue (and worker) of its own rather than starving either of those.
+REEMBED_QUEUE = os.getenv('REEMBED_QUEUE', 'reembed')
+INDEX_LARGE_BYTES = int(os.getenv('INDEX_LARGE_BYTES', 10 * 1024 * 1024))
+INDEX_LARGE_PAGES = int(os.getenv('INDEX_LARGE_PAGES', 200))
+# The Redis transport serves lower priority numbers first.
+INDEX_PRIORITY_INTERACTIVE = int(os.getenv('INDEX_PRIORITY_INTERACTIVE', 0))
+INDEX_PRIORITY_BULK = int(os.getenv('INDEX_PRIORITY_BULK', 6))
+INDEX_AUTOSCALE_TASKS_PER_WORKER = int(os.getenv('INDEX_AUTOSCALE_TASKS_PER_WORKER', 4))
+INDEX_AUTOSCALE_MIN_WORKERS = int(os.getenv('INDEX_AUTOSCALE_MIN_WORKERS', 1))
+INDEX_AUTOSCALE_MAX_WORKERS = int(os.getenv('INDEX_AUTOSCALE_MAX_WORKERS', 4))
+CELERY_TASK_ROUTES = {
+    'kb.tasks.index_document_task': {'queue': INDEX_QUEUE_SMALL},
+    'kb.tasks.delete_document_task': {'queue': MAINTENANCE_QUEUE},
+    'kb.tasks.delete_collection_task': {'queue': MAINTENANCE_QUEUE},
+    'kb.tasks.chunk_maintenance_task': {'queue': MAINTENANCE_QUEUE},
+    'kb.tasks.reembed_task': {'queue': REEMBED_QUEUE},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
+# Chunks removed per DELETE statement when documents are deleted or reindexed.
+DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', 5000))
+DOCS_BULK_DELETE_MAX = int(os.getenv('DOCS_BULK_DELETE_MAX', 1000))
+# kb_chunk upkeep (celery beat): VACUUM past the dead-tuple thresholds, REINDEX CONCURRENTLY HNSW indexes that
+# grew past MAINTENANCE_INDEX_BLOAT x their post-build size; only inside the window and when the database is idle.
+MAINTENANCE_INTERVAL = int(os.getenv('MAINTENANCE_INTERVAL', 900))
+MAINTENANCE_WINDOW = os.getenv('MAINTENANCE_WINDOW', '02:00-05:00')
+MAINTENANCE_DEAD_RATIO = float(os.getenv('MAINTENANCE_DEAD_RATIO', 0.2))
+MAINTENANCE_MIN_DEAD_TUPLES = int(os.getenv('MAINTENANCE_MIN_DEAD_TUPLES', 10000))
+MAINTENANCE_INDEX_BLOAT = float(os.getenv('MAINTENANCE_INDEX_BLOAT', 1.5))
+MAINTENANCE_MAX_ACTIVE_QUERIES = int(os.getenv('MAINTENANCE_MAX_ACTIVE_QUERIES', 2))
+MAINTENANCE_WORK_MEM = os.getenv('MAINTENANCE_WORK_MEM', '')
+MAINTENANCE_LOCK_TTL = int(os.getenv('MAINTENANCE_LOCK_TTL', 6 * 3600))
+CELERY_BEAT_SCHEDULE = {
+    'chunk-maintenance': {'task': 'kb.tasks.chunk_maintenance_task', 'schedule': MAINTENANCE_INTERVAL},
+} if MAINTENANCE_INTERVAL > 0 else {}
+
+INDEX_PROGRESS_TTL = int(os.getenv('INDEX_PROGRESS_TTL', 3600))
+INDEX_PROGRESS_STREAM_TIMEOUT = int(os.getenv('INDEX_PROGRESS_STREAM_TIMEOUT', 300))
+# Lifetime of the signed ?token= in an index response's events_url (EventSource cannot send headers).
+INDEX_PROGRESS_TOKEN_MAX_AGE = int(os.getenv('INDEX_PROGRESS_TOKEN_MAX_AGE', 3600))
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -155,6 +292,8 @@ CACHES = {
 }
 
 RATELIMIT_USE_CACHE = 'default'
+# Load tests against a single API user turn this off to measure capacity rather than the limiter.
+RATELIMIT_ENABLE = os.getenv('RATELIMIT_ENABLE', '1') == '1'
 
 CORS_ALLOWED_ORIGINS = [
     origin.strip()
@@ -1,6 +1,6 @@
 import { TOKEN_KEY } from '../constants';
 import { getStoredValue } from '../storage';
-import type { AskResponse, Document, IndexJob } from './types';
+import type { AskResponse, Document, IndexJob, IndexJobProgress, IndexStart } from './types';
 
 const BASE_URL = (import.meta.env.VITE_API_BASE_URL || '').replace(/\/$/, '');
 
@@ -99,8 +99,8 @@ export async function uploadDocument(title: string, file: File): Promise<Documen
   return res.data;
 }
 
-export async function indexDocument(docId: number): Promise<{ job_id: string; status: string }> {
-  const res = await apiRequest<{ job_id: string; status: string }>(`/api/docs/${docId}/index/`, {
+export async function indexDocument(docId: number): Promise<IndexStart> {
+  const res = await apiRequest<IndexStart>(`/api/docs/${docId}/index/`, {
     method: 'POST'
   });
 
@@ -129,6 +129,28 @@ export async function fetchJob(jobId: string): Promise<IndexJob> {
   return res.data;
 }
 
+// Subscribes to a job's progress stream instead of polling. onFinished fires once the job is DONE or
+// FAILED; onLost fires if the stream is refused (e.g. an expired token), so callers can fall back to polling.
+export function watchIndexJob(eventsUrl: string, onFinished: () => void, onLost: () => void): () => void {
+  const source = new EventSource(buildUrl(eventsUrl));
+  let finished = false;
+  source.addEventListener('progress', (event) => {
+    const payload = JSON.parse((event as MessageEvent<string>).data) as IndexJobProgress;
+    if (payload.status === 'DONE' || payload.status === 'FAILED') {
+      finished = true;
+      source.close();
+      onFinished();
+    }
+  });
+  source.onerror = () => {
+    // A stream that simply timed out is reopened by the browser; CLOSED means it was rejected.
+    if (!finished && source.readyState === EventSource.CLOSED) {
+      onLost();
+    }
+  };
+  return () => source.close();
+}
+
 export async function askQuestion(payload: {
   question: string;
   top_k?: number;
@@ -1,8 +1,9 @@
-export type DocumentStatus = 'UPLOADED' | 'INDEXING' | 'INDEXED' | 'FAILED';
+export type DocumentStatus = 'UPLOADED' | 'INDEXING' | 'INDEXED' | 'FAILED' | 'DELETING';
 
 export type Document = {
   id: number;
   title: string;
+  collection?: string;
   file: string;
   file_url?: string | null;
   created_at: string;
@@ -10,6 +11,8 @@ export type Document = {
   chunks_count: number;
   last_indexed_at?: string | null;
   error_message?: string | null;
+  content_hash?: string | null;
+  duplicate_of?: number | null;
 };
 
 export type IndexJobStatus = 'PENDING' | 'RUNNING' | 'DONE' | 'FAILED';
@@ -22,14 +25,39 @@ export type IndexJob = {
   finished_at?: string | null;
   error_message?: string | null;
   celery_task_id?: string | null;
+  chunks_total?: number;
+  chunks_embedded?: number;
+  chunks_written?: number;
+  embedding_tokens?: number;
+  cost_usd?: number;
+};
+
+export type IndexStart = {
+  job_id: string;
+  status: string;
+  queue?: string;
+  events_url?: string;
+};
+
+export type IndexJobProgress = {
+  job_id: number;
+  task_id: string;
+  document: number;
+  status: IndexJobStatus;
+  chunks_total: number;
+  chunks_embedded: number;
+  chunks_written: number;
+  error_message?: string | null;
 };
 
 export type AskSource = {
   citation: string;
+  doc_id?: number | null;
   doc_title?: string | null;
   chunk_index: number;
   score: number;
   text?: string | null;
+  truncated?: boolean;
 };
 
 export type AskTraceStep = {
@@ -38,15 +66,30 @@ export type AskTraceStep = {
   ms: number;
 };
 
+export type AskUsage = {
+  embedding_tokens: number;
+  prompt_tokens: number;
+  completion_tokens: number;
+  cost_usd: number;
+};
+
+export type AskCandidateDoc = {
+  doc_id: number;
+  distance: number;
+};
+
 export type AskTrace = {
   total_ms: number;
   hits: number;
   top_k: number;
   steps: AskTraceStep[];
+  usage?: AskUsage;
+  candidate_docs?: AskCandidateDoc[] | null;
 };
 
 export type AskResponse = {
   answer: string;
   sources?: AskSource[];
+  gated?: boolean;
   trace?: AskTrace;
 };
@@ -5,7 +5,8 @@ const statusMap: Record<DocumentStatus, { label: string; color: string }> = {
   UPLOADED: { label: 'Uploaded', color: 'gray' },
   INDEXING: { label: 'Indexing', color: 'yellow' },
   INDEXED: { label: 'Indexed', color: 'brand' },
-  FAILED: { label: 'Failed', color: 'red' }
+  FAILED: { label: 'Failed', color: 'red' },
+  DELETING: { label: 'Deleting', color: 'orange' }
 };
 
 type StatusBadgeProps = {
@@ -23,7 +23,14 @@ import {
 } from '@tabler/icons-react';
 import { useCallback, useEffect, useMemo, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { deleteDocument, getDocument, indexDocument, listDocuments, uploadDocument } from '../api/client';
+import {
+  deleteDocument,
+  getDocument,
+  indexDocument,
+  listDocuments,
+  uploadDocument,
+  watchIndexJob
+} from '../api/client';
 import type { Document } from '../api/types';
 import PageHeader from '../components/PageHeader';
 import StatusBadge from '../components/StatusBadge';
@@ -142,13 +149,17 @@ export default function DashboardPage() {
   const handleIndex = async (docId: number) => {
     setIndexingId(docId);
     try {
-      await indexDocument(docId);
+      const started = await indexDocument(docId);
       notifications.show({
         title: 'Indexing started',
         message: 'We will notify you when it finishes.',
         color: 'brand'
       });
-      pollDocument(docId);
+      if (started.events_url) {
+        watchIndexJob(started.events_url, () => pollDocument(docId), () => pollDocument(docId));
+      } else {
+        pollDocument(docId);
+      }
     } catch (err) {
       notifications.show({
         title: 'Failed to index',
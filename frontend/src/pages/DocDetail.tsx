@@ -3,7 +3,7 @@ import { notifications } from '@mantine/notifications';
 import { IconBolt, IconMessageDots, IconTrash } from '@tabler/icons-react';
 import { useEffect, useState } from 'react';
 import { Link, useNavigate, useParams } from 'react-router-dom';
-import { deleteDocument, getDocument, indexDocument } from '../api/client';
+import { deleteDocument, getDocument, indexDocument, watchIndexJob } from '../api/client';
 import type { Document } from '../api/types';
 import PageHeader from '../components/PageHeader';
 import StatusBadge from '../components/StatusBadge';
@@ -66,13 +66,17 @@ export default function DocDetailPage() {
     if (!docId) return;
     setIndexing(true);
     try {
-      await indexDocument(docId);
+      const started = await indexDocument(docId);
       notifications.show({
         title: 'Indexing started',
         message: 'We will notify you when it finishes.',
         color: 'brand'
       });
-      pollDocument();
+      if (started.events_url) {
+        watchIndexJob(started.events_url, () => pollDocument(), () => pollDocument());
+      } else {
+        pollDocument();
+      }
     } catch (err) {
       notifications.show({
         title: 'Failed to index',